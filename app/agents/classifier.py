@@ -1,79 +1,93 @@
+import asyncio
 import json
-from typing import Tuple, Dict, Any
+from typing import Dict, Any, List, Optional, Sequence, Union, TYPE_CHECKING
 from fastapi import UploadFile, HTTPException
-import PyPDF2
-from app.models.models import FileMetadata
-from sqlalchemy.orm import Session
-from app.models import models
-import io
+from app.core.sniffer import SNIFF_BYTES, detect_file_type
+from app.core.artifacts import text_artifacts
+from app.core.rules import RuleSet, RuleStore, rule_store
+
+if TYPE_CHECKING:
+    # SQLAlchemy models are imported on first use instead
+    from sqlalchemy.orm import Session
+    from app.models import models
 
 class ClassifierAgent:
-    def __init__(self):
-        self.file_types = ["Email", "JSON", "PDF"]
-        self.business_intents = [
-            "Invoice Processing",
-            "Contract Analysis",
-            "Report Generation",
-            "Data Extraction"
-        ]
+    def __init__(self, rules: Optional[RuleStore] = None):
+        self.file_types = ["Email", "JSON", "PDF", "Text"]
+        # Intent keywords (checked in order) and the default intent come from the rules file
+        self.rules = rules or rule_store
+
+    @property
+    def intent_keywords(self) -> Dict[str, List[str]]:
+        return self.rules.current.classifier.intent_keywords()
+
+    @property
+    def default_intent(self) -> str:
+        return self.rules.current.classifier.default_intent
+
+    @property
+    def business_intents(self) -> List[str]:
+        return list(self.intent_keywords) + [self.default_intent]
 
     async def detect_file_type(self, filename: str, content: bytes) -> str:
         """Detect the type of file based on content and extension."""
-        # Simple extension-based classification
-        if filename.lower().endswith('.pdf'):
-            return "PDF"
-        elif filename.lower().endswith('.json'):
-            return "JSON"
-        elif filename.lower().endswith(('.eml', '.msg')):
-            return "Email"
-        
-        # Content-based classification
-        try:
-            # Try to parse as JSON
-            json.loads(content.decode('utf-8'))
-            return "JSON"
-        except:
-            pass
-        
-        # Check for email headers
-        if b"From:" in content or b"To:" in content:
-            return "Email"
-        
-        # Default to PDF if no other type is detected
-        return "PDF"
+        # Only a bounded prefix is sniffed; the document is never parsed here
+        file_type, _ = detect_file_type(filename, content[:SNIFF_BYTES])
+        return file_type
 
     def classify_business_intent(self, content: str) -> str:
         """Classify the business intent based on content analysis."""
-        content_lower = content.lower()
-        max_matches = 0
-        best_intent = "Unknown"
+        return self.classify_batch([content])[0]["intent"]
 
-        for intent, keywords in self.business_intents.items():
-            matches = sum(1 for keyword in keywords if keyword in content_lower)
-            if matches > max_matches:
-                max_matches = matches
-                best_intent = intent
+    def classify_batch(
+        self,
+        documents: Sequence[Union[str, bytes]],
+        rules: Optional[RuleSet] = None,
+        with_scores: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Classify many documents under one rules snapshot.
 
-        return best_intent
+        A convenience loop over ClassifierRules.intent_for, one document at a
+        time; there is no vectorised batch path. It applies the same rule as
+        process_file and bulk ingest: the first intent, in rules order, with any
+        of its keywords in the document. With with_scores, each result also
+        counts the distinct keywords per intent.
+        """
+        classifier = (rules or self.rules.current).classifier
+        results = []
+        for document in documents:
+            content = document.encode("utf-8") if isinstance(document, str) else document
+            result: Dict[str, Any] = {"intent": classifier.intent_for(content)}
+            if with_scores:
+                result["scores"] = {
+                    intent: len({match.lower() for match in matcher.findall(content)})
+                    for intent, matcher in classifier.byte_matchers
+                }
+            results.append(result)
+        return results
 
-    async def process_file(self, filename: str, content: bytes, db: Session) -> models.FileMetadata:
+    async def process_file(self, filename: str, content: bytes, db: "Session") -> "models.FileMetadata":
         """Classify the uploaded file and determine its business intent."""
+        from app.core.database import commit_new
+        from app.models import models
+
         try:
             # Determine file type based on content and extension
             file_type = await self.detect_file_type(filename, content)
             
             # Determine business intent
-            business_intent = self._determine_business_intent(content)
+            rules = self.rules.current
+            business_intent = self._determine_business_intent(content, rules)
             
             # Create metadata record
             metadata = models.FileMetadata(
                 filename=filename,
                 file_type=file_type,
-                business_intent=business_intent
+                business_intent=business_intent,
+                rules_version=rules.version
             )
-            db.add(metadata)
-            db.commit()
-            db.refresh(metadata)
+            # Off the event loop: the insert may wait on the database write lock
+            await asyncio.to_thread(commit_new, db, metadata)
             
             return metadata
             
@@ -81,33 +95,17 @@ class ClassifierAgent:
             db.rollback()
             raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
     
-    def _determine_business_intent(self, content: bytes) -> str:
+    def _determine_business_intent(self, content: bytes, rules: Optional[RuleSet] = None) -> str:
         """Determine the business intent of the file."""
-        content_str = content.decode('utf-8', errors='ignore').lower()
-        
-        # Check for invoice-related keywords
-        if any(word in content_str for word in ['invoice', 'payment', 'amount', 'total']):
-            return "Invoice Processing"
-        
-        # Check for contract-related keywords
-        if any(word in content_str for word in ['contract', 'agreement', 'terms', 'conditions']):
-            return "Contract Analysis"
-        
-        # Check for report-related keywords
-        if any(word in content_str for word in ['report', 'summary', 'analysis', 'findings']):
-            return "Report Generation"
-        
-        # Default to data extraction
-        return "Data Extraction"
+        rules = rules or self.rules.current
+        # Precompiled case-insensitive bytes matcher per intent, so the raw bytes
+        # are neither decoded nor lowercased; falls back to the default intent
+        return rules.classifier.intent_for(content)
 
     def _read_pdf_content(self, content: bytes) -> str:
-        """Extract text content from PDF bytes."""
+        """Extract text content from PDF bytes, reusing a stored extraction."""
         try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text()
-            return text
+            return text_artifacts.pdf_text(content)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error reading PDF content: {str(e)}")
 
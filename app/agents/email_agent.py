@@ -1,54 +1,74 @@
+import asyncio
 import re
-from typing import Tuple, Dict, Any
+from email import policy
+from email.parser import BytesHeaderParser
+from typing import Tuple, Dict, Any, List, Optional, TYPE_CHECKING
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
-from app.models.models import EmailProcessing, ActionLog
 from datetime import datetime
+from app.core.records import EmailAnalysis, intern_label
+from app.core.rules import RuleSet, RuleStore, rule_store
+
+if TYPE_CHECKING:
+    # These pull in SQLAlchemy, so the agent imports them only when it touches the DB
+    from sqlalchemy.orm import Session
+    from app.models.models import EmailProcessing
+    from app.agents.escalation import EscalationAggregator
+
+# Compiled once at import rather than looked up in the re cache per email
+FROM_EMAIL_PATTERN = re.compile(r'From:\s*([\w\.-]+@[\w\.-]+\.\w+)', re.IGNORECASE)
+EMAIL_PATTERN = re.compile(r'[\w\.-]+@[\w\.-]+\.\w+')
+REQUEST_PATTERN = re.compile(r'Request:\s*(.*?)(?:\n|$)', re.IGNORECASE)
+
+# Headers are looked for in this much of a message, so the check stays cheap for any size
+HEADER_SCAN_BYTES = 8192
+# The headers that say how urgent a message is; From, To and the rest are never matched
+URGENCY_HEADERS = ("Subject", "Importance", "Priority", "X-Priority")
+HEADER_PARSER = BytesHeaderParser(policy=policy.default)
 
 class EmailAgent:
-    def __init__(self):
-        self.tone_keywords = {
-            "angry": ["angry", "furious", "outraged", "unacceptable", "terrible", "charged twice", "refund"],
-            "polite": ["please", "thank", "appreciate", "kindly", "regards"],
-            "threatening": ["sue", "legal", "lawyer", "court", "action"]
-        }
-        
-        self.urgency_keywords = {
-            "high": ["urgent", "immediately", "asap", "critical", "emergency", "high"],
-            "medium": ["soon", "shortly", "prompt", "quick", "timely"],
-            "low": ["whenever", "convenient", "sometime", "eventually"]
-        }
+    def __init__(self, escalations: Optional["EscalationAggregator"] = None, rules: Optional[RuleStore] = None):
+        self._escalations = escalations
+        # Tone/urgency keywords and the escalation condition come from the rules file
+        self.rules = rules or rule_store
+
+    @property
+    def tone_keywords(self) -> Dict[str, List[str]]:
+        return self.rules.current.email.tone.as_dict()
+
+    @property
+    def urgency_keywords(self) -> Dict[str, List[str]]:
+        return self.rules.current.email.urgency.as_dict()
+
+    @property
+    def escalations(self) -> "EscalationAggregator":
+        """The given aggregator, or the process-wide one."""
+        if self._escalations is None:
+            from app.agents.escalation import escalation_aggregator
+            self._escalations = escalation_aggregator
+        return self._escalations
 
-    def analyze_email(self, content: str) -> Tuple[str, str]:
+    def analyze_email(self, content: str, rules: Optional[RuleSet] = None) -> Tuple[str, str]:
         """Analyze email content to determine tone and urgency."""
+        rules = rules or self.rules.current
         content_lower = content.lower()
         
         # Analyze tone
-        tone_scores = {
-            tone: sum(1 for keyword in keywords if keyword in content_lower)
-            for tone, keywords in self.tone_keywords.items()
-        }
-        tone = max(tone_scores.items(), key=lambda x: x[1])[0]
+        tone = rules.email.tone.best(content_lower)
         
         # Analyze urgency
-        urgency_scores = {
-            urgency: sum(1 for keyword in keywords if keyword in content_lower)
-            for urgency, keywords in self.urgency_keywords.items()
-        }
-        urgency = max(urgency_scores.items(), key=lambda x: x[1])[0]
+        urgency = rules.email.urgency.best(content_lower)
         
         return tone, urgency
 
     def extract_sender_email(self, content: str) -> str:
         """Extract sender email from email content."""
         # Look for From: field first
-        from_match = re.search(r'From:\s*([\w\.-]+@[\w\.-]+\.\w+)', content, re.IGNORECASE)
+        from_match = FROM_EMAIL_PATTERN.search(content)
         if from_match:
             return from_match.group(1)
         
         # Fallback to any email in the content
-        email_pattern = r'[\w\.-]+@[\w\.-]+\.\w+'
-        matches = re.findall(email_pattern, content)
+        matches = EMAIL_PATTERN.findall(content)
         
         if not matches:
             raise HTTPException(status_code=400, detail="No sender email found in content")
@@ -58,49 +78,61 @@ class EmailAgent:
     def extract_request(self, content: str) -> str:
         """Extract the main request from the email content."""
         # Look for Request: field
-        request_match = re.search(r'Request:\s*(.*?)(?:\n|$)', content, re.IGNORECASE)
+        request_match = REQUEST_PATTERN.search(content)
         if request_match:
             return request_match.group(1).strip()
         
         # If no Request: field, return the whole content
         return content.strip()
 
-    async def process_email(self, content: str, file_id: int, db: Session) -> EmailProcessing:
+    def has_urgent_headers(self, content: bytes, rules: Optional[RuleSet] = None) -> bool:
+        """Quick pre-check for scheduling: do the headers carry escalation urgency keywords?
+
+        Parses only the header block and matches only URGENCY_HEADERS (folded
+        and RFC 2047 encoded values included), so it can run before the message
+        is processed.
+        """
+        rules = rules or self.rules.current
+        headers = HEADER_PARSER.parsebytes(content[:HEADER_SCAN_BYTES])
+        values = " ".join(str(value) for name in URGENCY_HEADERS for value in headers.get_all(name, ())).lower()
+        return rules.email.urgency.hits(rules.email.escalate_urgency, values) > 0
+
+    def needs_escalation(self, tone: str, urgency: str, rules: Optional[RuleSet] = None) -> bool:
+        """Emails matching the rules' escalate_when (angry and high by default) go to the CRM."""
+        rules = rules or self.rules.current
+        return tone == rules.email.escalate_tone and urgency == rules.email.escalate_urgency
+
+    def analyze_message(self, content: str, rules: Optional[RuleSet] = None) -> EmailAnalysis:
+        """Run the full content analysis for one email without touching the database."""
+        # One rules snapshot for the whole email
+        rules = rules or self.rules.current
+
+        # Extract sender email; repeat senders share one string across a batch
+        sender_email = intern_label(self.extract_sender_email(content))
+
+        # Analyze tone and urgency
+        tone, urgency = self.analyze_email(content, rules)
+
+        return EmailAnalysis(
+            sender_email=sender_email,
+            tone=tone,
+            urgency=urgency,
+            is_escalated=self.needs_escalation(tone, urgency, rules),
+            rules_version=rules.version
+        )
+
+    async def process_email(self, content: str, file_id: int, db: "Session") -> "EmailProcessing":
         """Process email content and store results in database."""
+        from app.models.models import EmailProcessing
+
         try:
-            # Extract sender email
-            sender_email = self.extract_sender_email(content)
-            
-            # Extract request
-            request = self.extract_request(content)
-            
-            # Analyze tone and urgency
-            tone, urgency = self.analyze_email(content)
-            
+            analysis = self.analyze_message(content)
+
             # Create email processing record
-            email_processing = EmailProcessing(
-                file_id=file_id,
-                sender_email=sender_email,
-                tone=tone,
-                urgency=urgency,
-                is_escalated=False
-            )
-            
-            # Check if escalation is needed
-            if tone == "angry" and urgency == "high":
-                email_processing.is_escalated = True
-                # Create action log for escalation
-                action_log = ActionLog(
-                    file_id=file_id,
-                    action_type="crm_escalation",
-                    status="pending",
-                    retry_count=0
-                )
-                db.add(action_log)
-            
-            db.add(email_processing)
-            db.commit()
-            db.refresh(email_processing)
+            email_processing = EmailProcessing(file_id=file_id, **analysis._asdict())
+
+            # Off the event loop: the writes may wait on the database write lock
+            await asyncio.to_thread(self._store, db, email_processing)
             
             return email_processing
             
@@ -108,14 +140,21 @@ class EmailAgent:
             db.rollback()
             raise HTTPException(status_code=500, detail=f"Error processing email: {str(e)}")
 
-    async def handle_escalation(self, email_processing: EmailProcessing, db: Session) -> None:
+    def _store(self, db: "Session", email_processing: "EmailProcessing") -> None:
+        """Write the result and its escalation in one transaction. Blocking."""
+        from app.core.database import commit_new
+
+        # Check if escalation is needed; repeat senders coalesce into one action
+        if email_processing.is_escalated:
+            self.escalations.escalate(db, email_processing.sender_email, email_processing.file_id)
+        commit_new(db, email_processing)
+
+    async def handle_escalation(self, email_processing: "EmailProcessing", db: "Session") -> None:
         """Handle email escalation by creating appropriate action logs."""
         if email_processing.is_escalated:
-            action_log = ActionLog(
-                file_id=email_processing.file_id,
-                action_type="crm_escalation",
-                status="pending",
-                retry_count=0
-            )
-            db.add(action_log)
-            db.commit() 
\ No newline at end of file
+            # Idempotent: reuses the escalation process_email already recorded
+            await asyncio.to_thread(self._ensure_escalation, db, email_processing)
+
+    def _ensure_escalation(self, db: "Session", email_processing: "EmailProcessing") -> None:
+        self.escalations.ensure(db, email_processing.sender_email, email_processing.file_id, email_processing.created_at)
+        db.commit() 
\ No newline at end of file
@@ -0,0 +1,152 @@
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.models import ActionLog
+
+ESCALATION_ACTION = "crm_escalation"
+
+# Session.info key of the ids upserted in a session's open transaction
+PENDING_IDS = "escalation_pending_ids"
+
+# An escalation event: (sender email, file id, when the email was received)
+EscalationEvent = Tuple[str, int, Optional[datetime]]
+
+
+class EscalationAggregator:
+    """Coalesces CRM escalations per sender within a fixed time window.
+
+    Windows are aligned to multiples of window_seconds, so every process derives
+    the same dedup key for a sender and the unique (action_type, dedup_key) index
+    on action_log settles races between workers. Ids are only cached once the
+    transaction that wrote them has committed.
+    """
+
+    def __init__(self, window_seconds: int = 3600, max_index_size: int = 100000):
+        self.window_seconds = window_seconds
+        self.max_index_size = max_index_size
+        # dedup_key -> action_log.id for windows this process has already escalated
+        self._index: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def dedup_key(self, sender_email: str, at: Optional[datetime] = None) -> str:
+        """Key shared by all escalations from one sender in one window."""
+        at = at or datetime.now(timezone.utc)
+        if at.tzinfo is None:
+            at = at.replace(tzinfo=timezone.utc)
+        window = int(at.timestamp()) // self.window_seconds
+        return f"{sender_email.strip().lower()}:{window}"
+
+    def escalate(self, db: Session, sender_email: str, file_id: int, at: Optional[datetime] = None) -> int:
+        """Record one escalation event. Returns the id of the coalesced action log."""
+        return self.escalate_many(db, [(sender_email, file_id, at)])[0]
+
+    def ensure(self, db: Session, sender_email: str, file_id: int, at: Optional[datetime] = None) -> int:
+        """Make sure an escalation exists for the sender's window without counting a new event."""
+        key = self.dedup_key(sender_email, at)
+        with self._lock:
+            action_id = self._index.get(key)
+        if action_id is not None:
+            return action_id
+        return self._upsert(db, {key: (file_id, 0)})[key]
+
+    def escalate_many(self, db: Session, events: Iterable[EscalationEvent]) -> List[int]:
+        """Record escalation events in bulk, one action log per sender window.
+
+        The caller owns the transaction; nothing is committed here.
+        """
+        keys = []
+        grouped: Dict[str, Tuple[int, int]] = {}
+        for sender_email, file_id, at in events:
+            key = self.dedup_key(sender_email, at)
+            keys.append(key)
+            first_file_id, count = grouped.get(key, (file_id, 0))
+            grouped[key] = (first_file_id, count + 1)
+
+        with self._lock:
+            known = {key: self._index[key] for key in grouped if key in self._index}
+        missing = {key: value for key, value in grouped.items() if key not in known}
+
+        if known:
+            # Windows already escalated by this process only need their counter bumped
+            now = datetime.now(timezone.utc)
+            for key, action_id in list(known.items()):
+                result = db.execute(
+                    update(ActionLog)
+                    .where(
+                        ActionLog.id == action_id,
+                        ActionLog.action_type == ESCALATION_ACTION,
+                        ActionLog.dedup_key == key
+                    )
+                    .values(event_count=ActionLog.event_count + grouped[key][1], last_event_at=now)
+                )
+                if result.rowcount == 0:
+                    # The cached row was removed; fall back to the upsert
+                    with self._lock:
+                        self._index.pop(key, None)
+                    del known[key]
+                    missing[key] = grouped[key]
+
+        if missing:
+            known.update(self._upsert(db, missing))
+
+        return [known[key] for key in keys]
+
+    def _upsert(self, db: Session, rows: Dict[str, Tuple[int, int]]) -> Dict[str, int]:
+        """Insert or bump action logs for the given windows and cache their ids."""
+        now = datetime.now(timezone.utc)
+        dialect = db.get_bind().dialect.name
+        insert = pg_insert if dialect == "postgresql" else sqlite_insert
+
+        ids = {}
+        for key, (file_id, count) in rows.items():
+            stmt = insert(ActionLog).values(
+                file_id=file_id,
+                action_type=ESCALATION_ACTION,
+                status="pending",
+                retry_count=0,
+                dedup_key=key,
+                event_count=max(count, 1),
+                last_event_at=now
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ActionLog.action_type, ActionLog.dedup_key],
+                set_={
+                    "event_count": ActionLog.event_count + count,
+                    "last_event_at": now
+                }
+            ).returning(ActionLog.id)
+            ids[key] = db.execute(stmt).scalar_one()
+
+        self._remember_on_commit(db, ids)
+        return ids
+
+    def _remember_on_commit(self, db: Session, ids: Dict[str, int]) -> None:
+        """Cache ids once db commits; a rollback discards them, as the ids may be reused."""
+        if PENDING_IDS not in db.info:
+            # Registered once per session; they stay for its lifetime
+            event.listen(db, "after_commit", self._on_commit)
+            event.listen(db, "after_rollback", self._on_rollback)
+        db.info.setdefault(PENDING_IDS, {}).update(ids)
+
+    def _on_commit(self, db: Session) -> None:
+        ids = db.info.get(PENDING_IDS)
+        if not ids:
+            return
+        db.info[PENDING_IDS] = {}
+        with self._lock:
+            if len(self._index) + len(ids) > self.max_index_size:
+                self._index.clear()
+            self._index.update(ids)
+
+    def _on_rollback(self, db: Session) -> None:
+        db.info[PENDING_IDS] = {}
+
+
+# Shared by every EmailAgent in the process so the index is not per request
+escalation_aggregator = EscalationAggregator()
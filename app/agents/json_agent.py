@@ -1,8 +1,11 @@
+import asyncio
 import json
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, TYPE_CHECKING
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
-from app.models.models import JsonProcessing, ActionLog
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+    from app.models.models import JsonProcessing
 
 class JsonAgent:
     def __init__(self):
@@ -65,8 +68,11 @@ class JsonAgent:
         }
         return type_map.get(json_type, object)
 
-    async def process_json(self, content: str, file_id: int, db: Session) -> JsonProcessing:
+    async def process_json(self, content: str, file_id: int, db: "Session") -> "JsonProcessing":
         """Process JSON content and store results in database."""
+        from app.core.database import commit_new
+        from app.models.models import JsonProcessing, ActionLog
+
         try:
             # Parse JSON content
             data = json.loads(content)
@@ -82,18 +88,17 @@ class JsonAgent:
             )
             
             # If anomalies found, create risk alert
+            alerts = []
             if not is_valid:
-                action_log = ActionLog(
+                alerts.append(ActionLog(
                     file_id=file_id,
                     action_type="risk_alert",
                     status="pending",
                     retry_count=0
-                )
-                db.add(action_log)
+                ))
             
-            db.add(json_processing)
-            db.commit()
-            db.refresh(json_processing)
+            # Off the event loop: the insert may wait on the database write lock
+            await asyncio.to_thread(commit_new, db, json_processing, *alerts)
             
             return json_processing
             
@@ -0,0 +1,411 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import zlib
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple, TYPE_CHECKING
+
+from fastapi import HTTPException
+from sqlalchemy import insert
+
+from app.agents.classifier import ClassifierAgent
+from app.agents.email_agent import EmailAgent
+from app.agents.escalation import escalation_aggregator
+from app.core.database import SessionLocal, init_db
+from app.core.records import IngestedEmail
+from app.core.search import MAX_INDEXED_CHARS, SearchIndex
+from app.core.storage import atomic_write
+from app.models.models import EmailProcessing, FileMetadata
+
+if TYPE_CHECKING:
+    from app.core.jobs import JobContext
+
+# A raw message and the checkpoint position reached once it has been stored
+RawMessage = Tuple[str, bytes, Any]
+
+DATE_HEADER = re.compile(rb"^Date:[ \t]*(.+?)\r?$", re.MULTILINE | re.IGNORECASE)
+
+_worker_agents: Optional[Tuple[EmailAgent, ClassifierAgent]] = None
+
+
+def _received_at(raw: bytes) -> Optional[datetime]:
+    """When the Date header says the message was sent, so backfills escalate in the right window."""
+    header_end = raw.find(b"\n\n")
+    if header_end < 0:
+        header_end = raw.find(b"\r\n\r\n")
+    match = DATE_HEADER.search(raw, 0, header_end if header_end >= 0 else len(raw))
+    if not match:
+        return None
+    try:
+        return parsedate_to_datetime(match.group(1).decode("ascii", errors="ignore"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _analyze_batch(batch: List[Tuple[str, bytes]]) -> List[IngestedEmail]:
+    """Analyze a batch of raw messages inside a worker process.
+
+    Messages that cannot be analyzed are left out of the returned records.
+    """
+    global _worker_agents
+    if _worker_agents is None:
+        _worker_agents = (EmailAgent(), ClassifierAgent())
+    email_agent, classifier = _worker_agents
+    # The whole batch is analyzed under one rules version
+    rules = email_agent.rules.current
+
+    # Same intent rule as process_file, under the batch's rules snapshot
+    intents = classifier.classify_batch([raw for _, raw in batch], rules)
+
+    results = []
+    for (key, raw), classified in zip(batch, intents):
+        content = raw.decode("utf-8", errors="replace")
+        try:
+            analysis = email_agent.analyze_message(content, rules)
+        except HTTPException:
+            continue
+        results.append(IngestedEmail(
+            key,
+            *analysis,
+            business_intent=classified["intent"],
+            received_at=_received_at(raw),
+            # Held until the batch is stored, so compressed rather than as a str
+            body=zlib.compress(content[:MAX_INDEXED_CHARS].encode("utf-8"), 1)
+        ))
+    return results
+
+
+def mailbox_root() -> str:
+    """Directory the API may ingest mailboxes from (MAILBOX_ROOT)."""
+    return os.path.realpath(os.environ.get("MAILBOX_ROOT", "mailboxes"))
+
+
+def resolve_mailbox(path: str) -> str:
+    """Real path of a mailbox requested through the API, which must lie under MAILBOX_ROOT.
+
+    Relative paths are taken relative to the root.
+    """
+    root = mailbox_root()
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise HTTPException(status_code=403, detail="Mailbox path is outside MAILBOX_ROOT")
+    return resolved
+
+
+def iter_mbox(path: str, start_offset: int = 0) -> Iterator[RawMessage]:
+    """Stream messages from an mbox file, yielding (key, raw bytes, next offset)."""
+    with open(path, "rb") as f:
+        f.seek(start_offset)
+        offset = start_offset
+        message_start = None
+        lines: List[bytes] = []
+        previous_blank = True
+        for line in f:
+            # A separator is a "From " line at the start or after a blank line
+            if line.startswith(b"From ") and previous_blank:
+                if message_start is not None:
+                    yield str(message_start), b"".join(lines), offset
+                message_start = offset
+                lines = []
+            elif message_start is not None:
+                lines.append(line)
+            previous_blank = line in (b"\n", b"\r\n")
+            offset += len(line)
+        if message_start is not None:
+            yield str(message_start), b"".join(lines), offset
+
+
+def _maildir_entries(path: str) -> List[Tuple[str, str]]:
+    """(key, file path) of every message in a Maildir's new/ and cur/."""
+    entries = []
+    for subdir in ("new", "cur"):
+        folder = os.path.join(path, subdir)
+        if not os.path.isdir(folder):
+            continue
+        for entry in os.scandir(folder):
+            if entry.is_file() and not entry.name.startswith("."):
+                # The part after ':' holds flags, which change when a message is read
+                entries.append((entry.name.split(":", 1)[0], entry.path))
+    return entries
+
+
+def iter_maildir(path: str, after_key: Optional[str] = None) -> Iterator[RawMessage]:
+    """Stream messages from a Maildir in key order, yielding (key, raw bytes, key)."""
+    entries = sorted(_maildir_entries(path))
+
+    for key, file_path in entries:
+        if after_key is not None and key <= after_key:
+            continue
+        try:
+            with open(file_path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            # Moved between new/ and cur/ by a mail client; picked up next run
+            continue
+        yield key, raw, key
+
+
+def read_message(path: str, key: str, maildir_index: Optional[Dict[str, str]] = None) -> Optional[bytes]:
+    """Raw message stored under key (mbox offset or Maildir name), or None if it is gone.
+
+    maildir_index maps Maildir keys to files (see index_maildir), so looking up
+    many messages does not list the directory each time.
+    """
+    if os.path.isdir(path):
+        file_path = (maildir_index if maildir_index is not None else index_maildir(path)).get(key)
+        if file_path is None:
+            return None
+        try:
+            with open(file_path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+    try:
+        offset = int(key)
+        # The first message from that offset, read up to the next separator only
+        message_key, raw, _ = next(iter_mbox(path, offset))
+    except (FileNotFoundError, ValueError, StopIteration):
+        return None
+    return raw if message_key == key else None
+
+
+def index_maildir(path: str) -> Dict[str, str]:
+    """Maildir key -> message file, for read_message."""
+    return dict(_maildir_entries(path))
+
+
+class MailboxIngestor:
+    """Bulk ingest of mbox files and Maildir directories through EmailAgent."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        batch_size: int = 500,
+        search_index: Optional[SearchIndex] = None,
+        state_dir: Optional[str] = None
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        # Checkpoints live with the app, so read-only mail spools can be ingested
+        self.state_dir = state_dir or os.environ.get("INGEST_STATE_DIR", "ingest_state")
+        self.search_index = search_index or SearchIndex()
+        self.index_errors = 0
+
+    @staticmethod
+    def detect_format(path: str) -> str:
+        """Maildirs are directories, everything else is read as mbox."""
+        return "maildir" if os.path.isdir(path) else "mbox"
+
+    def checkpoint_path(self, path: str) -> str:
+        """Checkpoint file in state_dir, named by the mailbox and a hash of its absolute path."""
+        path = os.path.abspath(path).rstrip(os.sep)
+        digest = hashlib.sha256(path.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.state_dir, f"{os.path.basename(path)}-{digest}.ingest.json")
+
+    @staticmethod
+    def _fresh_state(path: str, fmt: str) -> Dict[str, Any]:
+        return {
+            "path": os.path.abspath(path),
+            "format": fmt,
+            "position": None,
+            "processed": 0,
+            "escalated": 0,
+            "errors": 0,
+            "unindexed": 0,
+            "finished": False
+        }
+
+    def load_checkpoint(self, path: str) -> Optional[Dict[str, Any]]:
+        """Load the checkpoint for a mailbox, if one exists."""
+        checkpoint_file = self.checkpoint_path(path)
+        if not os.path.exists(checkpoint_file):
+            return None
+        with open(checkpoint_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_checkpoint(self, path: str, state: Dict[str, Any]) -> None:
+        """Write the checkpoint atomically so an interruption never corrupts it."""
+        os.makedirs(self.state_dir, exist_ok=True)
+        atomic_write(self.checkpoint_path(path), json.dumps(state).encode("utf-8"))
+
+    def _iter_batches(self, path: str, fmt: str, position: Any) -> Iterator[Tuple[List[Tuple[str, bytes]], Any]]:
+        """Group the message stream into batches, tagged with their end position."""
+        if fmt == "mbox":
+            messages = iter_mbox(path, position or 0)
+        elif fmt == "maildir":
+            messages = iter_maildir(path, position)
+        else:
+            raise HTTPException(status_code=400, detail=f"Unsupported mailbox format: {fmt}")
+
+        batch: List[Tuple[str, bytes]] = []
+        end = position
+        for key, raw, end in messages:
+            batch.append((key, raw))
+            if len(batch) >= self.batch_size:
+                yield batch, end
+                batch = []
+        if batch:
+            yield batch, end
+
+    def _store_batch(self, source: str, results: List[IngestedEmail], source_path: Optional[str] = None) -> Tuple[int, int]:
+        """Bulk insert the records for one analyzed batch. Returns (stored, escalated)."""
+        if not results:
+            return 0, 0
+
+        processed_at = datetime.now(timezone.utc)
+        db = SessionLocal()
+        try:
+            file_ids = db.scalars(
+                insert(FileMetadata).returning(FileMetadata.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "filename": f"{source}#{r.key}",
+                        "file_type": "Email",
+                        "business_intent": r.business_intent,
+                        "rules_version": r.rules_version,
+                        # Reprocessing re-reads the full message from here
+                        "source_path": source_path,
+                        # What /status serves, as for an uploaded email
+                        "processed_at": processed_at,
+                        "result": {
+                            "sender_email": r.sender_email,
+                            "tone": r.tone,
+                            "urgency": r.urgency,
+                            "is_escalated": r.is_escalated,
+                            "business_intent": r.business_intent,
+                            "rules_version": r.rules_version,
+                            "source_path": source_path
+                        }
+                    }
+                    for r in results
+                ]
+            ).all()
+
+            db.execute(insert(EmailProcessing), [
+                {
+                    "file_id": file_id,
+                    "sender_email": r.sender_email,
+                    "tone": r.tone,
+                    "urgency": r.urgency,
+                    "is_escalated": r.is_escalated,
+                    "rules_version": r.rules_version
+                }
+                for file_id, r in zip(file_ids, results)
+            ])
+
+            # One crm_escalation per sender window, however many angry emails it covers
+            escalations = [
+                (r.sender_email, file_id, r.received_at)
+                for file_id, r in zip(file_ids, results) if r.is_escalated
+            ]
+            if escalations:
+                escalation_aggregator.escalate_many(db, escalations)
+
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        try:
+            # The batch is already one transaction, so it is indexed as one too
+            self.search_index.add_many(
+                {
+                    "file_id": file_id,
+                    "filename": f"{source}#{r.key}",
+                    "file_type": "Email",
+                    "business_intent": r.business_intent,
+                    "body": r.text
+                }
+                for file_id, r in zip(file_ids, results)
+            )
+        except Exception:
+            # Search is derived data; a failed batch must not stop the ingest
+            self.index_errors += len(results)
+        return len(results), len(escalations)
+
+    def ingest(
+        self,
+        path: str,
+        fmt: str = "auto",
+        resume: bool = True,
+        on_progress: Optional[Callable[[Dict[str, Any]], Any]] = None
+    ) -> Dict[str, Any]:
+        """Ingest a mailbox, resuming from its checkpoint unless resume is False.
+
+        on_progress, if given, receives the state after every stored batch.
+        """
+        if not os.path.exists(path):
+            raise HTTPException(status_code=404, detail=f"Mailbox not found: {path}")
+        if fmt == "auto":
+            fmt = self.detect_format(path)
+
+        init_db()
+        state = self.load_checkpoint(path) if resume else None
+        if state is None or state.get("format") != fmt:
+            state = self._fresh_state(path, fmt)
+        state["finished"] = False
+        source_path = os.path.abspath(path).rstrip(os.sep)
+        source = os.path.basename(source_path)
+
+        pending: Deque[Tuple[Future, int, Any]] = deque()
+
+        def drain_one() -> None:
+            future, batch_len, end = pending.popleft()
+            index_errors = self.index_errors
+            stored, escalated = self._store_batch(source, future.result(), source_path)
+            # Batches are committed in stream order, so the checkpoint only moves forward
+            state["position"] = end
+            state["processed"] += stored
+            state["escalated"] += escalated
+            state["errors"] += batch_len - stored
+            state["unindexed"] = state.get("unindexed", 0) + self.index_errors - index_errors
+            self._save_checkpoint(path, state)
+            if on_progress is not None:
+                on_progress(state)
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for batch, end in self._iter_batches(path, fmt, state["position"]):
+                pending.append((pool.submit(_analyze_batch, batch), len(batch), end))
+                # Bound the number of batches held in memory
+                if len(pending) >= self.workers * 2:
+                    drain_one()
+            while pending:
+                drain_one()
+
+        state["finished"] = True
+        self._save_checkpoint(path, state)
+        return state
+
+
+def ingest_job(payload: Dict[str, Any], context: "JobContext") -> Dict[str, Any]:
+    """JobWorker handler for a queued mailbox_ingest job."""
+    ingestor = MailboxIngestor(workers=payload.get("workers"), batch_size=payload.get("batch_size", 500))
+    path = resolve_mailbox(payload["path"])
+    # A job re-claimed after its worker died always picks up from the last checkpoint
+    resume = payload.get("resume", True) or context.attempt > 1
+    return ingestor.ingest(path, fmt=payload.get("format", "auto"), resume=resume, on_progress=context.report)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Bulk ingest an mbox file or Maildir through the Email Agent.")
+    parser.add_argument("path", help="mbox file or Maildir directory")
+    parser.add_argument("--format", choices=["auto", "mbox", "maildir"], default="auto")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--restart", action="store_true", help="ignore any existing checkpoint")
+    args = parser.parse_args(argv)
+
+    ingestor = MailboxIngestor(workers=args.workers, batch_size=args.batch_size)
+    state = ingestor.ingest(args.path, fmt=args.format, resume=not args.restart)
+    print(json.dumps(state, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,82 +1,108 @@
-import re
-from typing import Tuple, Optional
+import asyncio
+import json
+from typing import Tuple, Optional, Dict, Any, List, NamedTuple, TYPE_CHECKING
 from fastapi import HTTPException
-import PyPDF2
-from sqlalchemy.orm import Session
-from app.models.models import PdfProcessing, ActionLog
+from app.core.artifacts import TextArtifactStore, text_artifacts
+from app.core.line_items import has_table_header
+from app.core.records import PdfAnalysis
+from app.core.rules import RuleSet, RuleStore, rule_store
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+    from app.models.models import PdfProcessing
 
 class PdfAgent:
-    def __init__(self):
-        self.high_value_threshold = 10000
-        self.regulation_keywords = {
-            "GDPR": ["gdpr", "general data protection regulation", "data protection"],
-            "FDA": ["fda", "food and drug administration", "medical device"]
-        }
-
-    async def process_pdf(self, content: bytes, file_id: int, db: Session) -> PdfProcessing:
-        """Process PDF content and store results in database."""
+    def __init__(self, rules: Optional[RuleStore] = None):
+        # Threshold, regulation keywords and amount patterns come from the rules file
+        self.rules = rules or rule_store
+
+    @property
+    def high_value_threshold(self) -> float:
+        return self.rules.current.pdf.high_value_threshold
+
+    @property
+    def regulation_keywords(self) -> Dict[str, List[str]]:
+        return {name: list(keywords) for name, keywords in self.rules.current.pdf.regulation_keywords.items()}
+
+    def analyze_text(self, text: str, rules: Optional[RuleSet] = None) -> PdfAnalysis:
+        """Run the content analysis on already extracted PDF text."""
+        # One rules snapshot for the whole document
+        rules = rules or self.rules.current
+        
+        # Extract total amount
+        total_amount = self._extract_total_amount(text, rules)
+        
+        # Check for regulations
+        return PdfAnalysis(
+            total_amount=total_amount,
+            is_high_value=total_amount is not None and total_amount > rules.pdf.high_value_threshold,
+            has_gdpr=self._check_regulation(text, "GDPR", rules),
+            has_fda=self._check_regulation(text, "FDA", rules),
+            rules_version=rules.version
+        )
+
+    async def process_pdf(
+        self,
+        content: bytes,
+        file_id: int,
+        db: "Session",
+        text: Optional[str] = None,
+        line_items: Optional[List[Dict[str, Any]]] = None,
+        analysis: Optional[PdfAnalysis] = None
+    ) -> "PdfProcessing":
+        """Process PDF content and store results in database.
+
+        Pass analysis when it was already computed in a worker process (see
+        read_pdf), or text when only that has been extracted, and line_items
+        when the document's item table was read.
+        """
+        from app.core.database import commit_new
+        from app.models.models import PdfProcessing, ActionLog
+
         try:
-            # Extract text from PDF
-            text = self._extract_text_from_pdf(content)
-            
-            # Extract total amount
-            total_amount = self._extract_total_amount(text)
-            
-            # Check for regulations
-            has_gdpr = self._check_regulation(text, "GDPR")
-            has_fda = self._check_regulation(text, "FDA")
+            if analysis is None:
+                # Extract text from PDF
+                if text is None:
+                    text = await asyncio.to_thread(self._extract_text_from_pdf, content)
+                # The patterns scan the whole text, so keep them off the event loop
+                analysis = await asyncio.to_thread(self.analyze_text, text)
             
             # Create PDF processing record
-            pdf_processing = PdfProcessing(
-                file_id=file_id,
-                total_amount=total_amount,
-                is_high_value=total_amount is not None and total_amount > self.high_value_threshold,
-                has_gdpr=has_gdpr,
-                has_fda=has_fda
-            )
+            pdf_processing = PdfProcessing(file_id=file_id, line_items=line_items, **analysis._asdict())
             
             # Create risk alert if high value or regulations found
+            alerts = []
             if (pdf_processing.is_high_value or pdf_processing.has_gdpr or 
                 pdf_processing.has_fda):
-                action_log = ActionLog(
+                alerts.append(ActionLog(
                     file_id=file_id,
                     action_type="risk_alert",
                     status="pending",
                     retry_count=0
-                )
-                db.add(action_log)
+                ))
             
-            db.add(pdf_processing)
-            db.commit()
-            db.refresh(pdf_processing)
+            # Off the event loop: the insert may wait on the database write lock
+            await asyncio.to_thread(commit_new, db, pdf_processing, *alerts)
             
             return pdf_processing
             
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
     def _extract_text_from_pdf(self, content: bytes) -> str:
-        """Extract text content from PDF bytes."""
+        """Extract text content from PDF bytes, reusing a stored extraction."""
         try:
-            pdf_reader = PyPDF2.PdfReader(content)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text()
-            return text
+            return text_artifacts.pdf_text(content)
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Error reading PDF: {str(e)}")
 
-    def _extract_total_amount(self, text: str) -> Optional[float]:
+    def _extract_total_amount(self, text: str, rules: Optional[RuleSet] = None) -> Optional[float]:
         """Extract total amount from PDF text."""
-        # Common patterns for total amount
-        patterns = [
-            r'total[\s:]+[$]?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            r'amount[\s:]+[$]?(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            r'[$]?(\d+(?:,\d{3})*(?:\.\d{2})?)\s*(?:total|amount)',
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        rules = rules or self.rules.current
+        for pattern in rules.pdf.total_amount_patterns:
+            matches = pattern.findall(text)
             if matches:
                 # Convert string amount to float
                 amount_str = matches[0].replace(',', '')
@@ -87,13 +113,15 @@ class PdfAgent:
         
         return None
 
-    def _check_regulation(self, text: str, regulation: str) -> bool:
+    def _check_regulation(self, text: str, regulation: str, rules: Optional[RuleSet] = None) -> bool:
         """Check if text contains specific regulation keywords."""
-        if regulation not in self.regulation_keywords:
+        rules = rules or self.rules.current
+        matcher = rules.pdf.regulation_matchers.get(regulation)
+        if matcher is None:
             return False
-            
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in self.regulation_keywords[regulation])
+        
+        # Precompiled case-insensitive alternation: one scan, no lowercased copy
+        return matcher.search(text) is not None
 
     def _is_invoice(self, text: str) -> bool:
         """Check if PDF is an invoice based on common keywords."""
@@ -113,4 +141,38 @@ class PdfAgent:
         ]
         
         text_lower = text.lower()
-        return any(keyword in text_lower for keyword in policy_keywords) 
\ No newline at end of file
+        return any(keyword in text_lower for keyword in policy_keywords) 
+
+
+class PdfReading(NamedTuple):
+    """A PDF's text and everything derived from it, as a pool worker hands it back."""
+    text: str
+    page_count: int
+    word_count: int
+    has_table_header: bool
+    analysis: PdfAnalysis
+
+
+# Rules compiled in this worker process, keyed by the source the parent sent
+_worker_rules: Dict[str, RuleSet] = {}
+
+
+def read_pdf(artifacts: TextArtifactStore, content: bytes, key: str, rules_source: str) -> PdfReading:
+    """Text and analysis of a PDF, for a process pool worker.
+
+    Parses the PDF only if no artifact exists for its content. Workers do not
+    watch the rules file, so the parent passes the source of the rules in force.
+    """
+    rules = _worker_rules.get(rules_source)
+    if rules is None:
+        _worker_rules.clear()
+        rules = _worker_rules[rules_source] = RuleSet.compile(json.loads(rules_source))
+    pages = artifacts.pdf_pages(content, key)
+    text = "\n".join(pages)
+    return PdfReading(
+        text=text,
+        page_count=len(pages),
+        word_count=len(text.split()),
+        has_table_header=has_table_header(text),
+        analysis=PdfAgent().analyze_text(text, rules)
+    )
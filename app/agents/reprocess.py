@@ -0,0 +1,377 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple, Union, TYPE_CHECKING
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.agents.email_agent import EmailAgent
+from app.agents.json_agent import JsonAgent
+from app.agents.mailbox_ingest import index_maildir, read_message
+from app.agents.pdf_agent import PdfAgent
+from app.core.artifacts import TextArtifactStore, content_key
+from app.core.database import SessionLocal, init_db
+from app.core.jobs import REPROCESS_JOB, JobQueue, run_job
+from app.core.records import EmailAnalysis, JsonAnalysis, PdfAnalysis
+from app.core.rules import RuleSet, RuleStore, rule_store
+from app.core.search import SearchIndex
+from app.models.models import EmailProcessing, FileMetadata, JsonProcessing, PdfProcessing
+
+if TYPE_CHECKING:
+    from app.core.jobs import JobContext
+
+# Agent name -> the file type it handles and the table its results go to
+AGENTS = {
+    "pdf": ("PDF", PdfProcessing),
+    "email": ("Email", EmailProcessing),
+    "json": ("JSON", JsonProcessing)
+}
+
+# A stored document to re-run: (file id, file type, filename, content hash, source mailbox)
+StoredDocument = Tuple[int, str, str, Optional[str], Optional[str]]
+
+Analysis = Union[PdfAnalysis, EmailAnalysis, JsonAnalysis]
+
+# A re-run result on its way to the database: (file id, file type, analysis)
+Reprocessed = Tuple[int, str, Analysis]
+
+_worker: Optional[Dict[str, Any]] = None
+
+
+def _init_worker(upload_dir: str, artifact_root: str, search_path: str, rules_source: str) -> None:
+    """Build the agents and text sources once per pool process."""
+    global _worker
+    _worker = {
+        # The rules the parent snapshotted at the start of the run, whatever the file says now
+        "rules": RuleSet.compile(json.loads(rules_source)),
+        "pdf": PdfAgent(),
+        "email": EmailAgent(),
+        "json": JsonAgent(),
+        "upload_dir": upload_dir,
+        "artifacts": TextArtifactStore(artifact_root),
+        "search_index": SearchIndex(search_path),
+        # Maildir key -> file per source mailbox, listed once per worker
+        "maildirs": {}
+    }
+
+
+def _read_upload(file_type: str, filename: str, content_hash: Optional[str]) -> Optional[str]:
+    """Text of the original upload, if it is still on disk with the same content."""
+    path = os.path.join(_worker["upload_dir"], os.path.basename(filename))
+    if not os.path.isfile(path):
+        return None
+    with open(path, "rb") as f:
+        content = f.read()
+    key = content_key(content)
+    if content_hash and key != content_hash:
+        # Overwritten by a later upload of the same name
+        return None
+    if file_type == "PDF":
+        try:
+            # Parses (and stores) only if no artifact exists for this content yet
+            return _worker["artifacts"].pdf_text(content, key)
+        except Exception:
+            # A corrupt upload is reported as missing text rather than failing the run
+            return None
+    return content.decode("utf-8", errors="replace")
+
+
+def _read_source(filename: str, source_path: str) -> Optional[str]:
+    """Full text of a bulk-ingested email, re-read from the mailbox it came from."""
+    key = filename.rsplit("#", 1)[1]
+    index = None
+    if os.path.isdir(source_path):
+        cache = _worker["maildirs"]
+        index = cache.get(source_path)
+        if index is None or key not in index:
+            # Listed again when a message moved between new/ and cur/ since
+            index = cache[source_path] = index_maildir(source_path)
+    raw = read_message(source_path, key, index)
+    return raw.decode("utf-8", errors="replace") if raw is not None else None
+
+
+def _load_texts(documents: Sequence[StoredDocument]) -> Tuple[Dict[int, str], int]:
+    """Text for each document and how many came from the search index.
+
+    PDF artifact, then the upload or, for bulk-ingested emails, the source
+    mailbox. Only when those are gone does the search index serve, whose
+    bodies are truncated to MAX_INDEXED_CHARS.
+    """
+    texts: Dict[int, str] = {}
+    from_index = []
+    for file_id, file_type, filename, content_hash, source_path in documents:
+        text = None
+        if file_type == "PDF" and content_hash:
+            pages = _worker["artifacts"].get_pages(content_hash)
+            if pages is not None:
+                text = "\n".join(pages)
+        # source_path marks bulk-ingested mail; an upload's own name may contain "#"
+        if text is None and source_path is None:
+            text = _read_upload(file_type, filename, content_hash)
+        elif text is None:
+            text = _read_source(filename, source_path)
+        if text is None:
+            from_index.append(file_id)
+        else:
+            texts[file_id] = text
+    bodies = _worker["search_index"].get_bodies(from_index)
+    texts.update(bodies)
+    return texts, len(bodies)
+
+
+def _analyze(file_type: str, text: str) -> Analysis:
+    if file_type == "PDF":
+        return _worker["pdf"].analyze_text(text, _worker["rules"])
+    if file_type == "Email":
+        return _worker["email"].analyze_message(text, _worker["rules"])
+    return JsonAnalysis(*_worker["json"].validate_schema(json.loads(text)))
+
+
+def _reprocess_chunk(documents: List[StoredDocument]) -> Dict[str, Any]:
+    """Load the cached text of a chunk of documents and re-run their agents, inside a worker."""
+    texts, from_index = _load_texts(documents)
+    results: List[Reprocessed] = []
+    missing = errors = 0
+    for file_id, file_type, *_ in documents:
+        text = texts.get(file_id)
+        if text is None:
+            missing += 1
+            continue
+        try:
+            result = _analyze(file_type, text)
+        except Exception:
+            errors += 1
+            continue
+        results.append((file_id, file_type, result))
+    return {"results": results, "missing": missing, "errors": errors, "from_search_index": from_index}
+
+
+class Reprocessor:
+    """Re-runs agents over every stored document and writes their results as a new version.
+
+    Results go into the agents' usual tables with version set to the run's job
+    id, next to the upload-time rows (version NULL) and earlier runs. Only the
+    analysis is repeated: no risk alerts or CRM escalations are raised again.
+    Pool workers load each document's text themselves from the artifact store,
+    the upload directory or the source mailbox, so no document is parsed twice
+    and the parent process only scans ids and writes results. Documents whose
+    source is gone fall back to their truncated search index body, counted as
+    from_search_index.
+    """
+
+    def __init__(
+        self,
+        agents: Sequence[str] = tuple(AGENTS),
+        workers: Optional[int] = None,
+        chunk_size: int = 500,
+        upload_dir: str = "uploads",
+        artifacts: Optional[TextArtifactStore] = None,
+        search_index: Optional[SearchIndex] = None,
+        rules: Optional[RuleStore] = None,
+        report_interval: float = 1.0
+    ):
+        unknown = set(agents) - set(AGENTS)
+        if unknown:
+            raise ValueError(f"Unknown agents: {', '.join(sorted(unknown))}")
+        self.agents = list(agents)
+        self.file_types = [AGENTS[agent][0] for agent in self.agents]
+        self.tables = {AGENTS[agent][0]: AGENTS[agent][1] for agent in self.agents}
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.upload_dir = upload_dir
+        self.artifacts = artifacts or TextArtifactStore()
+        self.search_index = search_index or SearchIndex()
+        self.rules = rules or rule_store
+        self.report_interval = report_interval
+
+    def resume_point(self, db: Session, version: int) -> int:
+        """Highest file id this version already has results for (chunks commit in id order)."""
+        return max(
+            db.scalar(select(func.max(table.file_id)).where(table.version == version)) or 0
+            for table in self.tables.values()
+        )
+
+    def _count(self, db: Session, after_id: int) -> int:
+        return db.scalar(
+            select(func.count()).select_from(FileMetadata)
+            .where(FileMetadata.file_type.in_(self.file_types), FileMetadata.id > after_id)
+        )
+
+    def _iter_chunks(self, after_id: int) -> Iterator[List[StoredDocument]]:
+        """Stored documents in id order, paged by id so each page is an index range scan."""
+        db = SessionLocal()
+        try:
+            while True:
+                rows = db.execute(
+                    select(
+                        FileMetadata.id, FileMetadata.file_type, FileMetadata.filename,
+                        FileMetadata.content_hash, FileMetadata.source_path
+                    )
+                    .where(FileMetadata.file_type.in_(self.file_types), FileMetadata.id > after_id)
+                    .order_by(FileMetadata.id)
+                    .limit(self.chunk_size)
+                ).all()
+                if not rows:
+                    return
+                yield [tuple(row) for row in rows]
+                after_id = rows[-1].id
+        finally:
+            db.close()
+
+    def _store(self, version: int, results: List[Reprocessed]) -> None:
+        by_type: Dict[str, List[Dict[str, Any]]] = {}
+        for file_id, file_type, analysis in results:
+            by_type.setdefault(file_type, []).append(dict(analysis._asdict(), file_id=file_id, version=version))
+
+        db = SessionLocal()
+        try:
+            for file_type, rows in by_type.items():
+                db.execute(insert(self.tables[file_type]), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def run(self, version: int, on_progress: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Dict[str, Any]:
+        """Reprocess every stored document for the selected agents as result version `version`.
+
+        Picks up after the last document this version already has results for,
+        so a re-run of an interrupted version continues where it stopped.
+        """
+        init_db()
+        db = SessionLocal()
+        try:
+            start_after = self.resume_point(db, version)
+            total = self._count(db, start_after)
+        finally:
+            db.close()
+
+        # Every document in the run is analyzed under this one rules version
+        rules = self.rules.current
+        started = time.monotonic()
+        last_report = 0.0
+        progress = {
+            "version": version,
+            "rules_version": rules.version,
+            "agents": self.agents,
+            "resumed_after": start_after,
+            "total": total,
+            "processed": 0,
+            "stored": 0,
+            "missing": 0,
+            "from_search_index": 0,
+            "errors": 0,
+            "last_file_id": start_after,
+            "docs_per_second": 0.0,
+            "eta_seconds": None,
+            "finished": False
+        }
+
+        def report(force: bool = False) -> None:
+            nonlocal last_report
+            elapsed = time.monotonic() - started
+            rate = progress["processed"] / elapsed if elapsed > 0 else 0.0
+            progress["elapsed_seconds"] = round(elapsed, 1)
+            progress["docs_per_second"] = round(rate, 1)
+            progress["eta_seconds"] = round((total - progress["processed"]) / rate, 1) if rate else None
+            if on_progress is not None and (force or elapsed - last_report >= self.report_interval):
+                last_report = elapsed
+                on_progress(dict(progress))
+
+        pending: Deque[Tuple[Future, int, int]] = deque()
+
+        def drain_one() -> None:
+            future, chunk_len, last_id = pending.popleft()
+            chunk = future.result()
+            if chunk["results"]:
+                self._store(version, chunk["results"])
+            progress["processed"] += chunk_len
+            progress["stored"] += len(chunk["results"])
+            progress["missing"] += chunk["missing"]
+            progress["from_search_index"] += chunk["from_search_index"]
+            progress["errors"] += chunk["errors"]
+            progress["last_file_id"] = last_id
+            report()
+
+        initargs = (self.upload_dir, self.artifacts.root, self.search_index.path, rules.source)
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=initargs) as pool:
+            for chunk in self._iter_chunks(start_after):
+                pending.append((pool.submit(_reprocess_chunk, chunk), len(chunk), chunk[-1][0]))
+                # Bound the chunks in flight; results are stored in id order
+                if len(pending) >= self.workers * 2:
+                    drain_one()
+            while pending:
+                drain_one()
+
+        progress["finished"] = True
+        report(force=True)
+        progress["rules"] = rules.as_dict()
+        return progress
+
+
+def reprocess_job(payload: Dict[str, Any], context: "JobContext") -> Dict[str, Any]:
+    """JobWorker handler for a queued reprocess job; the job id is the result version."""
+    reprocessor = Reprocessor(
+        agents=payload.get("agents", list(AGENTS)),
+        workers=payload.get("workers"),
+        chunk_size=payload.get("chunk_size", 500)
+    )
+    return reprocessor.run(context.job_id, on_progress=context.report)
+
+
+def versioned_results(db: Session, file_id: int, file_type: str) -> List[Dict[str, Any]]:
+    """Every result stored for a file by its agent, upload-time first, then by version."""
+    agent = next((agent for agent, (handled, _) in AGENTS.items() if handled == file_type), None)
+    if agent is None:
+        return []
+    table = AGENTS[agent][1]
+    rows = db.scalars(
+        select(table).where(table.file_id == file_id).order_by(table.version.is_not(None), table.version, table.id)
+    ).all()
+    columns = [column.name for column in table.__table__.columns]
+    return [{name: getattr(row, name) for name in columns} for row in rows]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Re-run agents over every stored document as a new result version.")
+    parser.add_argument("--agents", nargs="+", choices=list(AGENTS), default=list(AGENTS))
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    init_db()
+    queue = JobQueue()
+    payload = {"agents": args.agents, "workers": args.workers, "chunk_size": args.chunk_size}
+    db = SessionLocal()
+    try:
+        # Same queue as POST /reprocess, so the CLI and the API never run two at once
+        job = queue.enqueue(db, REPROCESS_JOB, payload, dedup_key=REPROCESS_JOB)
+    finally:
+        db.close()
+
+    def handler(payload: Dict[str, Any], context: "JobContext") -> Dict[str, Any]:
+        def report(progress: Dict[str, Any]) -> None:
+            context.report(progress)
+            print(
+                f"[v{progress['version']}] {progress['processed']}/{progress['total']} "
+                f"{progress['docs_per_second']} docs/s, eta {progress['eta_seconds']}s",
+                file=sys.stderr
+            )
+        reprocessor = Reprocessor(agents=payload["agents"], workers=payload["workers"], chunk_size=payload["chunk_size"])
+        return reprocessor.run(context.job_id, on_progress=report)
+
+    if job.status != "pending":
+        parser.exit(1, f"A reprocess job is already running (job {job.id})\n")
+    result = run_job(queue, job.id, REPROCESS_JOB, handler)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
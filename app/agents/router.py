@@ -0,0 +1,354 @@
+import asyncio
+import math
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.agents.classifier import ClassifierAgent
+from app.agents.email_agent import EmailAgent
+from app.agents.json_agent import JsonAgent
+from app.agents.pdf_agent import PdfAgent, read_pdf
+from app.core.admission import MB, overloaded
+from app.core.artifacts import TextArtifactStore, content_key, text_artifacts
+from app.core.extraction import warm_up_worker
+from app.core.line_items import extract_line_items
+from app.core.records import PREVIEW_FIELDS, preview, with_preview
+from app.core.scheduler import BULK, INTERACTIVE, URGENT, PriorityScheduler, parse_weights
+from app.core.search import SearchIndexer
+from app.schemas import schemas
+
+WARM_UP_DOCUMENT = (
+    b"From: warm-up@example.com\nSubject: warm-up\n\n"
+    b"Please see the attached invoice. Total: 1,250.00, urgent."
+)
+
+# Fewest pages of one invoice handed to a pool worker for line item extraction
+LINE_ITEM_PAGES_PER_TASK = 4
+# Most pool tasks one document's line item extraction runs at once
+LINE_ITEM_TASKS_PER_DOCUMENT = 4
+
+# Called with the content, file id, session and content hash; returns the
+# agent's result and the document text to index for search
+Handler = Callable[[bytes, int, Session, str], Awaitable[Tuple[Dict[str, Any], str]]]
+
+
+def default_pdf_workers() -> int:
+    """CPU cores divided among the web workers, so N workers don't each fork a pool per core."""
+    web_workers = int(os.environ.get("WEB_CONCURRENCY") or 1)
+    return max(1, (os.cpu_count() or 1) // web_workers)
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+class AgentLane:
+    """Concurrency limit, and optionally an executor, dedicated to one agent.
+
+    Each file type gets its own lane so a slow document class can only ever
+    occupy its own slots, never the capacity of the others. Queued documents
+    get slots by priority class (see PriorityScheduler), so a small PDF does not
+    wait behind a run of 300-page ones. At most max_queue documents wait for a
+    slot; beyond that the lane rejects with 429.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        executor: Optional[Executor] = None,
+        max_queue: int = 32,
+        retry_after: int = 5,
+        weights: Optional[Dict[str, float]] = None,
+        max_wait: float = 10.0
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.executor = executor
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.scheduler = PriorityScheduler(max_concurrency, weights, max_wait)
+        self.rejected = 0
+
+    @property
+    def active(self) -> int:
+        return self.scheduler.active
+
+    @property
+    def waiting(self) -> int:
+        return self.scheduler.waiting
+
+    def check_capacity(self) -> None:
+        """Raise 429 if a new document would have to queue beyond max_queue."""
+        if self.active + self.waiting >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            raise overloaded(429, f"{self.name} queue is full", self.retry_after)
+
+    @asynccontextmanager
+    async def slot(self, priority: str) -> AsyncIterator["AgentLane"]:
+        self.check_capacity()
+        async with self.scheduler.slot(priority):
+            yield self
+
+    @asynccontextmanager
+    async def idle_slots(self, count: int) -> AsyncIterator[int]:
+        """Up to count extra slots that are free right now, for fanning out one document's work."""
+        taken = self.scheduler.take_idle(count)
+        try:
+            yield taken
+        finally:
+            for _ in range(taken):
+                self.scheduler.release()
+
+    async def run_blocking(self, fn: Callable, *args: Any) -> Any:
+        """Run fn on the lane's executor (the default thread pool if it has none)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fn, *args)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "max_queue": self.max_queue,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "executor": type(self.executor).__name__ if self.executor else "event_loop",
+            "priorities": self.scheduler.stats()["classes"]
+        }
+
+
+class AgentRouter:
+    """Runs ClassifierAgent on a document, then dispatches it to its agent.
+
+    PDF text extraction and analysis are CPU-bound and run in a process pool,
+    which hands back only the text and a compact analysis; JSON, email and
+    plain-text analysis are cheap and run on the event loop. Database writes,
+    which can wait on the write lock, run on threads. Create the router
+    inside the running event loop (e.g. on application startup). Given an
+    indexer, every processed document's text is queued for full-text search.
+    PDFs are parsed only when the artifact store has no text for their content.
+    A PDF whose text has an item table header gets its line items read page
+    range by page range, on its own lane slot plus whichever PDF slots are
+    idle, and stored alongside its text.
+
+    Every document is given a priority class: urgent for emails whose headers
+    carry the rules' escalation urgency keywords, interactive for documents up
+    to small_document_bytes, bulk for the rest. The class orders the queue of
+    its lane and of the pipeline, a cap on documents processed at once across
+    all lanes, so urgent and small items keep low latency during a backfill.
+    """
+
+    def __init__(
+        self,
+        pdf_workers: Optional[int] = None,
+        json_concurrency: Optional[int] = None,
+        email_concurrency: Optional[int] = None,
+        text_concurrency: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        retry_after: Optional[int] = None,
+        indexer: Optional[SearchIndexer] = None,
+        artifacts: Optional[TextArtifactStore] = None,
+        pipeline_slots: Optional[int] = None,
+        small_document_bytes: int = 1 * MB,
+        priority_weights: Optional[Dict[str, float]] = None,
+        max_wait: Optional[float] = None
+    ):
+        self.indexer = indexer
+        self.artifacts = artifacts or text_artifacts
+        self.classifier = ClassifierAgent()
+        self.pdf_agent = PdfAgent()
+        self.json_agent = JsonAgent()
+        self.email_agent = EmailAgent()
+
+        # Lane limits not given here come from the environment, like the admission limits
+        pdf_workers = pdf_workers or _env_int("PDF_WORKERS", 0) or default_pdf_workers()
+        json_concurrency = json_concurrency or _env_int("JSON_CONCURRENCY", 64)
+        email_concurrency = email_concurrency or _env_int("EMAIL_CONCURRENCY", 64)
+        text_concurrency = text_concurrency or _env_int("TEXT_CONCURRENCY", 64)
+        max_queue = max_queue if max_queue is not None else _env_int("LANE_MAX_QUEUE", 32)
+        retry_after = retry_after or _env_int("LANE_RETRY_AFTER", 5)
+        self.pdf_executor = ProcessPoolExecutor(max_workers=pdf_workers)
+
+        weights = priority_weights or parse_weights(os.environ.get("PRIORITY_WEIGHTS"))
+        max_wait = max_wait if max_wait is not None else _env_float("PRIORITY_MAX_WAIT", 10.0)
+        self.small_document_bytes = small_document_bytes
+        # Room for every PDF worker plus as many cheap documents again per core
+        pipeline_slots = pipeline_slots or int(os.environ.get("PIPELINE_SLOTS") or pdf_workers + 2 * (os.cpu_count() or 1))
+        self.pipeline = PriorityScheduler(pipeline_slots, weights, max_wait)
+
+        lane_options = {"max_queue": max_queue, "retry_after": retry_after, "weights": weights, "max_wait": max_wait}
+        self.lanes: Dict[str, AgentLane] = {
+            "PDF": AgentLane("PDF", pdf_workers, self.pdf_executor, **lane_options),
+            "JSON": AgentLane("JSON", json_concurrency, **lane_options),
+            "Email": AgentLane("Email", email_concurrency, **lane_options),
+            "Text": AgentLane("Text", text_concurrency, **lane_options)
+        }
+        self.handlers: Dict[str, Handler] = {
+            "PDF": self._process_pdf,
+            "JSON": self._process_json,
+            "Email": self._process_email,
+            "Text": self._process_text
+        }
+
+    def lane_for(self, file_type: str) -> AgentLane:
+        lane = self.lanes.get(file_type)
+        if lane is None:
+            raise HTTPException(status_code=400, detail=f"Unsupported file type: {file_type}")
+        return lane
+
+    def check_capacity(self, file_type: str) -> None:
+        """Fail fast (400/429) before a document is stored if its lane cannot take it."""
+        self.lane_for(file_type).check_capacity()
+
+    def priority_for(self, file_type: str, content: bytes) -> str:
+        """Scheduling class of a document, from its type, size and a header pre-check."""
+        if file_type == "Email" and self.email_agent.has_urgent_headers(content):
+            return URGENT
+        return INTERACTIVE if len(content) <= self.small_document_bytes else BULK
+
+    async def route(self, filename: str, content: bytes, db: Session) -> Dict[str, Any]:
+        """Classify a document, process it with its agent and return the combined result."""
+        # Type detection only sniffs a prefix, so pick the lane before any DB work
+        file_type = await self.classifier.detect_file_type(filename, content)
+        lane = self.lane_for(file_type)
+        priority = self.priority_for(file_type, content)
+
+        # Lane first: documents queued for a busy lane must not hold pipeline slots
+        async with lane.slot(priority), self.pipeline.slot(priority):
+            # hashlib releases the GIL, so large documents don't stall the event loop
+            key = await asyncio.to_thread(content_key, content)
+            metadata = await self.classifier.process_file(filename, content, db)
+            result, text = await self.handlers[metadata.file_type](content, metadata.id, db, key)
+
+        # Stored on the row so /status answers the same in every worker process;
+        # the preview goes in its own column so loading results never drags it along
+        preview_text = result.pop(PREVIEW_FIELDS.get(metadata.file_type), None)
+        await asyncio.to_thread(self._save_result, db, metadata, key, preview_text, result)
+
+        if self.indexer is not None:
+            self.indexer.submit({
+                "file_id": metadata.id,
+                "filename": metadata.filename,
+                "file_type": metadata.file_type,
+                "business_intent": metadata.business_intent,
+                "body": text
+            })
+
+        return {
+            "file_id": metadata.id,
+            "file_type": metadata.file_type,
+            "business_intent": metadata.business_intent,
+            "priority": priority,
+            "result": with_preview(metadata.file_type, result, preview_text)
+        }
+
+    @staticmethod
+    def _save_result(db: Session, metadata: Any, key: str, preview_text: Optional[str], result: Dict[str, Any]) -> None:
+        """Commit the result onto the metadata row. Blocks on the database, so it runs on a thread."""
+        metadata.content_hash = key
+        metadata.preview = preview_text
+        metadata.result = result
+        metadata.processed_at = datetime.now(timezone.utc)
+        db.commit()
+        # Reloaded here so reading the row afterwards does not query on the event loop
+        db.refresh(metadata)
+
+    async def _process_pdf(self, content: bytes, file_id: int, db: Session, key: str) -> Tuple[Dict[str, Any], str]:
+        lane = self.lanes["PDF"]
+        rules = self.pdf_agent.rules.current
+        try:
+            # Parsing (first time only) and every scan of the text run in a pool
+            # worker; the loop only gets the text back for the search index
+            reading = await lane.run_blocking(read_pdf, self.artifacts, content, key, rules.source)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Error reading PDF: {str(e)}")
+        line_items = await self._line_items(content, key, reading.page_count) if reading.has_table_header else None
+
+        pdf_processing = await self.pdf_agent.process_pdf(
+            content, file_id, db, line_items=line_items, analysis=reading.analysis
+        )
+        result = schemas.PdfProcessing.model_validate(pdf_processing).model_dump(mode="json")
+        result["word_count"] = reading.word_count
+        result["preview"] = preview(reading.text)
+        return result, reading.text
+
+    async def _line_items(self, content: bytes, key: str, page_count: int) -> Optional[List[Dict[str, Any]]]:
+        """Line items of a PDF's item table, extracted in parallel page ranges unless already stored.
+
+        The document holds one PDF lane slot already; page ranges beyond the
+        first only run on slots that are idle, up to LINE_ITEM_TASKS_PER_DOCUMENT
+        in all, so one long invoice never takes workers queued documents wait for.
+        """
+        items = await asyncio.to_thread(self.artifacts.get_line_items, key)
+        if items is not None:
+            return items
+
+        lane = self.lanes["PDF"]
+        wanted = min(LINE_ITEM_TASKS_PER_DOCUMENT, math.ceil(page_count / LINE_ITEM_PAGES_PER_TASK))
+        try:
+            async with lane.idle_slots(wanted - 1) as extra:
+                per_task = math.ceil(page_count / (1 + extra)) if page_count else 1
+                chunks = await asyncio.gather(*(
+                    lane.run_blocking(extract_line_items, content, start, start + per_task)
+                    for start in range(0, page_count, per_task)
+                ))
+        except Exception:
+            # A layout the walker cannot read costs the line items, not the upload
+            return None
+        items = [item._asdict() for chunk in chunks for item in chunk]
+        await asyncio.to_thread(self.artifacts.put_line_items, key, items)
+        return items
+
+    async def _process_json(self, content: bytes, file_id: int, db: Session, key: str) -> Tuple[Dict[str, Any], str]:
+        text = content.decode("utf-8", errors="replace")
+        json_processing = await self.json_agent.process_json(text, file_id, db)
+        return schemas.JsonProcessing.model_validate(json_processing).model_dump(mode="json"), text
+
+    async def _process_email(self, content: bytes, file_id: int, db: Session, key: str) -> Tuple[Dict[str, Any], str]:
+        text = content.decode("utf-8", errors="replace")
+        email_processing = await self.email_agent.process_email(text, file_id, db)
+        result = schemas.EmailProcessing.model_validate(email_processing).model_dump(mode="json")
+        result["content_preview"] = preview(text)
+        return result, text
+
+    async def _process_text(self, content: bytes, file_id: int, db: Session, key: str) -> Tuple[Dict[str, Any], str]:
+        text = content.decode("utf-8", errors="replace")
+        words = text.split()
+        return {
+            "file_id": file_id,
+            "word_count": len(words),
+            "summary": " ".join(words[:10]) + "..." if len(words) > 10 else text
+        }, text
+
+    async def warm_up(self) -> Dict[str, Any]:
+        """Exercise every agent's matchers and start the PDF workers before taking traffic."""
+        text = WARM_UP_DOCUMENT.decode()
+        await self.classifier.detect_file_type("warm-up.eml", WARM_UP_DOCUMENT)
+        self.classifier.classify_batch([WARM_UP_DOCUMENT])
+        self.email_agent.analyze_message(text)
+        self.email_agent.has_urgent_headers(WARM_UP_DOCUMENT)
+        self.email_agent.escalations
+        self.pdf_agent.analyze_text(text)
+        self.json_agent.validate_schema({})
+
+        # One task per slot makes the pool fork all of its workers now
+        lane = self.lanes["PDF"]
+        pids = await asyncio.gather(*(lane.run_blocking(warm_up_worker) for _ in range(lane.max_concurrency)))
+        return {"pdf_workers": len(set(pids))}
+
+    def stats(self) -> Dict[str, Any]:
+        return {**{name: lane.stats() for name, lane in self.lanes.items()}, "pipeline": self.pipeline.stats()}
+
+    def shutdown(self) -> None:
+        self.pdf_executor.shutdown(wait=False, cancel_futures=True)
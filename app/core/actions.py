@@ -0,0 +1,177 @@
+import asyncio
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.jobs import _with_session
+from app.models.models import ActionLog
+
+
+class ActionDispatcher:
+    """Delivers pending action_log rows (CRM escalations, risk alerts) to an HTTP sink.
+
+    Each action is POSTed as JSON with an Idempotency-Key of its id. Rows are
+    claimed like jobs: a compare-and-set moves them from pending to sending
+    under a lease, so the dispatchers of several workers never deliver the same
+    row at once, and rows of a dispatcher that died go back to pending when the
+    lease runs out. A failed delivery is retried with exponential backoff up to
+    max_retries times, then the row is marked failed.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        batch_size: int = 50,
+        concurrency: int = 8,
+        poll_interval: float = 1.0,
+        max_retries: int = 5,
+        timeout: float = 5.0,
+        lease_seconds: int = 60
+    ):
+        self.url = url
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.lease_seconds = lease_seconds
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+        self._slots = asyncio.Semaphore(concurrency)
+        self._local = threading.local()
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["ActionDispatcher"]:
+        """A dispatcher for ACTION_SINK_URL, or None when no sink is configured."""
+        url = os.environ.get("ACTION_SINK_URL")
+        return cls(url) if url else None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    @staticmethod
+    def _claimable(now: datetime):
+        return or_(
+            and_(ActionLog.status == "pending", or_(ActionLog.next_attempt_at.is_(None), ActionLog.next_attempt_at <= now)),
+            # Sending under an expired lease: its dispatcher died mid-delivery
+            and_(ActionLog.status == "sending", ActionLog.next_attempt_at < now)
+        )
+
+    def claim(self, db: Session) -> List[Dict[str, Any]]:
+        """Claim up to batch_size deliverable actions, oldest first."""
+        now = datetime.now(timezone.utc)
+        candidates = select(ActionLog.id).where(self._claimable(now)).order_by(ActionLog.id).limit(self.batch_size)
+        if db.bind.dialect.name != "sqlite":
+            candidates = candidates.with_for_update(skip_locked=True)
+        ids = db.scalars(candidates).all()
+
+        claimed = []
+        for action_id in ids:
+            # Compare-and-set per row, as in JobQueue.claim
+            result = db.execute(
+                update(ActionLog)
+                .where(ActionLog.id == action_id, self._claimable(now))
+                .values(status="sending", next_attempt_at=now + timedelta(seconds=self.lease_seconds))
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                claimed.append(action_id)
+        db.commit()
+        if not claimed:
+            return []
+
+        rows = db.scalars(select(ActionLog).where(ActionLog.id.in_(claimed)).order_by(ActionLog.id)).all()
+        return [
+            {
+                "id": row.id,
+                "action_type": row.action_type,
+                "file_id": row.file_id,
+                "dedup_key": row.dedup_key,
+                "event_count": row.event_count,
+                "retry_count": row.retry_count or 0,
+                "created_at": row.created_at.isoformat() if row.created_at else None
+            }
+            for row in rows
+        ]
+
+    def finish(self, db: Session, action: Dict[str, Any], error: Optional[str]) -> None:
+        """Mark a delivered action done, or schedule its retry (failed once out of retries)."""
+        now = datetime.now(timezone.utc)
+        retries = action["retry_count"] + (1 if error else 0)
+        if error is None:
+            values = {"status": "success", "completed_at": now, "next_attempt_at": None}
+        elif retries >= self.max_retries:
+            values = {"status": "failed", "retry_count": retries, "completed_at": now, "next_attempt_at": None}
+        else:
+            values = {"status": "pending", "retry_count": retries, "next_attempt_at": now + timedelta(seconds=2 ** retries)}
+        db.execute(
+            update(ActionLog)
+            .where(ActionLog.id == action["id"], ActionLog.status == "sending")
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+    def _post(self, action: Dict[str, Any]) -> Optional[str]:
+        """Deliver one action; returns an error message, or None on success."""
+        import requests
+
+        # One keep-alive session per delivery thread
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        payload = {key: value for key, value in action.items() if key != "retry_count"}
+        try:
+            response = session.post(
+                self.url, json=payload, timeout=self.timeout, headers={"Idempotency-Key": f"action-{action['id']}"}
+            )
+        except requests.RequestException as e:
+            return str(e) or type(e).__name__
+        if response.status_code >= 300:
+            return f"HTTP {response.status_code}"
+        return None
+
+    async def _deliver(self, action: Dict[str, Any]) -> None:
+        async with self._slots:
+            error = await asyncio.to_thread(self._post, action)
+        await asyncio.to_thread(_with_session, self.finish, action, error)
+        if error is None:
+            self.delivered += 1
+        elif action["retry_count"] + 1 >= self.max_retries:
+            self.failed += 1
+        else:
+            self.retried += 1
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                actions = await asyncio.to_thread(_with_session, self.claim)
+            except Exception:
+                # Database briefly unavailable or locked; try again next poll
+                actions = []
+            if actions:
+                # A row whose outcome could not be saved is retried once its lease expires
+                await asyncio.gather(*(self._deliver(action) for action in actions), return_exceptions=True)
+            if len(actions) < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "failed": self.failed
+        }
@@ -0,0 +1,180 @@
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from fastapi import HTTPException
+
+MB = 1024 * 1024
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+class AdmissionController:
+    """Caps the uploads a process holds at once, by count and by body bytes.
+
+    Bytes are reserved from the declared Content-Length before any of the body is
+    read (the full max_body_bytes when the length is unknown), so the memory held
+    by in-flight uploads never exceeds max_inflight_bytes. Uploads larger than
+    small_body_bytes may only use (1 - reserved_fraction) of either limit; the
+    rest is kept for small uploads, so a backfill of large PDFs cannot lock out
+    an urgent email.
+    """
+
+    def __init__(
+        self,
+        max_inflight_bytes: int = 256 * MB,
+        max_inflight_jobs: int = 64,
+        max_body_bytes: int = 50 * MB,
+        retry_after: int = 5,
+        small_body_bytes: int = 1 * MB,
+        reserved_fraction: float = 0.25
+    ):
+        self.max_inflight_bytes = max_inflight_bytes
+        self.max_inflight_jobs = max_inflight_jobs
+        self.max_body_bytes = max_body_bytes
+        self.retry_after = retry_after
+        self.small_body_bytes = small_body_bytes
+        self.reserved_fraction = reserved_fraction
+
+        self.inflight_bytes = 0
+        self.inflight_jobs = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        return cls(
+            max_inflight_bytes=_env_int("UPLOAD_MAX_INFLIGHT_BYTES", 256 * MB),
+            max_inflight_jobs=_env_int("UPLOAD_MAX_INFLIGHT_JOBS", 64),
+            max_body_bytes=_env_int("UPLOAD_MAX_BODY_BYTES", 50 * MB),
+            retry_after=_env_int("UPLOAD_RETRY_AFTER", 5),
+            small_body_bytes=_env_int("UPLOAD_SMALL_BODY_BYTES", 1 * MB),
+            reserved_fraction=float(os.environ.get("UPLOAD_RESERVED_FRACTION") or 0.25)
+        )
+
+    def try_admit(self, nbytes: int) -> bool:
+        """Reserve a job slot and nbytes of body, or return False if saturated."""
+        share = 1.0 if nbytes <= self.small_body_bytes else 1.0 - self.reserved_fraction
+        with self._lock:
+            if (self.inflight_jobs >= self.max_inflight_jobs * share
+                    or self.inflight_bytes + nbytes > self.max_inflight_bytes * share):
+                self.rejected += 1
+                return False
+            self.inflight_jobs += 1
+            self.inflight_bytes += nbytes
+            return True
+
+    def release(self, nbytes: int) -> None:
+        with self._lock:
+            self.inflight_jobs -= 1
+            self.inflight_bytes -= nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inflight_jobs": self.inflight_jobs,
+            "max_inflight_jobs": self.max_inflight_jobs,
+            "inflight_bytes": self.inflight_bytes,
+            "max_inflight_bytes": self.max_inflight_bytes,
+            "max_body_bytes": self.max_body_bytes,
+            "small_body_bytes": self.small_body_bytes,
+            "reserved_fraction": self.reserved_fraction,
+            "rejected": self.rejected
+        }
+
+
+def overloaded(status_code: int, detail: str, retry_after: int) -> HTTPException:
+    """429/503 telling the client when to try again."""
+    return HTTPException(status_code=status_code, detail=detail, headers={"Retry-After": str(retry_after)})
+
+
+class AdmissionMiddleware:
+    """ASGI middleware enforcing an AdmissionController on upload paths.
+
+    Rejections happen before the body is read: 413 when Content-Length is over
+    the limit, 503 with Retry-After when the process is saturated. Bodies without
+    a (truthful) Content-Length are counted while streaming and cut off with 413
+    as soon as they pass max_body_bytes.
+    """
+
+    def __init__(self, app, controller: AdmissionController, paths: Iterable[str] = ("/upload",)):
+        self.app = app
+        self.controller = controller
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller
+        content_length = self._content_length(scope)
+        if content_length is not None and content_length > controller.max_body_bytes:
+            await self._reject(send, 413, f"Body exceeds {controller.max_body_bytes} bytes")
+            return
+
+        reserved = content_length if content_length is not None else controller.max_body_bytes
+        if not controller.try_admit(reserved):
+            await self._reject(send, 503, "Server is at upload capacity", controller.retry_after)
+            return
+
+        received = 0
+        too_large = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, too_large
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > min(reserved, controller.max_body_bytes):
+                    too_large = True
+                    # Stop the app reading any further; its error response is replaced below
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if too_large:
+                if not response_started:
+                    response_started = True
+                    await self._reject(send, 413, f"Body exceeds {controller.max_body_bytes} bytes")
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not too_large:
+                raise
+            if not response_started:
+                await self._reject(send, 413, f"Body exceeds {controller.max_body_bytes} bytes")
+        finally:
+            controller.release(reserved)
+
+    @staticmethod
+    def _content_length(scope) -> Optional[int]:
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    return int(value)
+                except ValueError:
+                    return None
+        return None
+
+    @staticmethod
+    async def _reject(send, status_code: int, detail: str, retry_after: Optional[int] = None) -> None:
+        body = json.dumps({"detail": detail}).encode()
+        headers: Tuple[Tuple[bytes, bytes], ...] = (
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode())
+        )
+        if retry_after is not None:
+            headers += ((b"retry-after", str(retry_after).encode()),)
+        await send({"type": "http.response.start", "status": status_code, "headers": list(headers)})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import struct
+import zlib
+from typing import Any, Dict, List, Optional
+
+from app.core.extraction import extract_pdf_pages
+from app.core.storage import atomic_write
+
+# Artifact layout: MAGIC, page count, a (offset, length) entry per page, then
+# each page's UTF-8 text compressed on its own so any page range reads alone
+MAGIC = b"TXTA\x01"
+COUNT = struct.Struct("<I")
+ENTRY = struct.Struct("<QI")
+
+
+def content_key(content: bytes) -> str:
+    """SHA-256 of the raw document, the key its artifacts are stored under."""
+    return hashlib.sha256(content).hexdigest()
+
+
+class TextArtifactStore:
+    """Extracted text of parsed documents, stored once per distinct content.
+
+    Artifacts are files under root named by content hash, written atomically,
+    so every worker process and node sharing root reuses the same extraction and
+    an identical re-upload is never parsed again. Instances only hold the root
+    path and can be sent to a process pool.
+    """
+
+    def __init__(self, root: Optional[str] = None, compress_level: int = 6):
+        self.root = root or os.environ.get("TEXT_ARTIFACT_DIR", "artifacts")
+        self.compress_level = compress_level
+
+    def path(self, key: str) -> str:
+        # Two-character fan-out keeps directories small at millions of documents
+        return os.path.join(self.root, key[:2], key + ".pages")
+
+    def line_items_path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + ".items.json")
+
+    def put_pages(self, key: str, pages: List[str]) -> None:
+        blobs = [zlib.compress(page.encode("utf-8"), self.compress_level) for page in pages]
+        header = bytearray(MAGIC + COUNT.pack(len(blobs)))
+        offset = 0
+        for blob in blobs:
+            header += ENTRY.pack(offset, len(blob))
+            offset += len(blob)
+
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write(path, bytes(header) + b"".join(blobs))
+
+    def get_pages(self, key: str, start: int = 0, stop: Optional[int] = None) -> Optional[List[str]]:
+        """Pages start..stop of a stored artifact, or None if there is none.
+
+        Only the index and the requested pages are read and decompressed.
+        """
+        try:
+            f = open(self.path(key), "rb")
+        except FileNotFoundError:
+            return None
+        with f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            (count,) = COUNT.unpack(f.read(COUNT.size))
+            entries = list(ENTRY.iter_unpack(f.read(count * ENTRY.size)))
+            selected = entries[start:stop]
+            if not selected:
+                return []
+
+            data_start = len(MAGIC) + COUNT.size + count * ENTRY.size
+            first_offset = selected[0][0]
+            f.seek(data_start + first_offset)
+            # The selected pages are contiguous, so one read covers them
+            data = f.read(selected[-1][0] + selected[-1][1] - first_offset)
+
+        return [
+            zlib.decompress(data[offset - first_offset:offset - first_offset + length]).decode("utf-8")
+            for offset, length in selected
+        ]
+
+    def put_line_items(self, key: str, items: List[Dict[str, Any]]) -> None:
+        path = self.line_items_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write(path, json.dumps(items).encode("utf-8"))
+
+    def get_line_items(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Stored invoice line items of a document, or None if none were extracted yet."""
+        try:
+            with open(self.line_items_path(key), "rb") as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            return None
+
+    def extract_pdf(self, content: bytes, key: Optional[str] = None) -> List[str]:
+        """Parse a PDF and store its pages. Safe to run in a process pool worker."""
+        key = key or content_key(content)
+        pages = extract_pdf_pages(content)
+        self.put_pages(key, pages)
+        return pages
+
+    def pdf_pages(self, content: bytes, key: Optional[str] = None) -> List[str]:
+        """Pages of a PDF, parsing it only if no artifact exists for its content."""
+        key = key or content_key(content)
+        pages = self.get_pages(key)
+        if pages is None:
+            pages = self.extract_pdf(content, key)
+        return pages
+
+    def pdf_text(self, content: bytes, key: Optional[str] = None) -> str:
+        """Full text of a PDF, one line break between pages."""
+        return "\n".join(self.pdf_pages(content, key))
+
+
+# Shared by the agents and endpoints of this process
+text_artifacts = TextArtifactStore()
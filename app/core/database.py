@@ -1,16 +1,77 @@
-from sqlalchemy import create_engine
+import os
+import time
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./multi_agent.db"
+# Every worker process (and node) must point at the same database
+SQLALCHEMY_DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./multi_agent.db")
+
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False, "timeout": 30}
+    )
+
+    @event.listens_for(engine, "connect")
+    def _configure_sqlite(dbapi_connection, connection_record):
+        """WAL lets readers in other processes run alongside the single writer."""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.close()
+else:
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True)
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+def init_db(retries: int = 5):
+    """Create missing tables and bring existing ones up to date."""
+    # Imported here so the models register themselves on Base
+    from app.models import models  # noqa: F401
+    for attempt in range(retries):
+        try:
+            Base.metadata.create_all(bind=engine)
+            _upgrade_schema()
+            return
+        except (OperationalError, ProgrammingError):
+            # Workers starting together race to create the same tables; the
+            # loser retries and finds them already there
+            if attempt == retries - 1:
+                raise
+            time.sleep(0.2 * (attempt + 1))
+
+def _upgrade_schema():
+    """Add columns and indexes introduced after a table was first created."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in columns:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(conn)
+
+def commit_new(db, record, *related) -> None:
+    """Add record (and related rows), commit and reload record.
+
+    Blocks while the database is locked (up to busy_timeout under SQLite), so
+    async code runs it with asyncio.to_thread.
+    """
+    db.add_all(related)
+    db.add(record)
+    db.commit()
+    db.refresh(record)
+
 # Dependency
 def get_db():
     db = SessionLocal()
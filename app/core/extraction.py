@@ -0,0 +1,205 @@
+import io
+import math
+import os
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# Text matrix / CTM as (a, b, c, d, e, f)
+Matrix = Tuple[float, float, float, float, float, float]
+IDENTITY: Matrix = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+# TJ kerning adjustments (thousandths of an em) at least this wide stand for a
+# space between words, and at least TJ_RUN_BREAK wide start a new run:
+# producers use such gaps in one array to lay out separate cells
+TJ_SPACE = 200
+TJ_RUN_BREAK = 1000
+# Glyph width assumed for fonts without a /Widths array, e.g. the standard 14
+DEFAULT_GLYPH_WIDTH = 500.0
+
+
+class TextRun(NamedTuple):
+    """A piece of text drawn at one spot: baseline origin, advance width and font size in user space."""
+    x: float
+    y: float
+    width: float
+    text: str
+    size: float
+
+
+def extract_pdf_pages(content: bytes) -> List[str]:
+    """Extract the text of each page of a PDF.
+
+    A plain module-level function so it can be shipped to a process pool.
+    """
+    # Imported here so processes that never parse a PDF don't pay for PyPDF2
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
+    return [page.extract_text() or "" for page in pdf_reader.pages]
+
+
+def _multiply(m: Matrix, n: Matrix) -> Matrix:
+    return (
+        m[0] * n[0] + m[1] * n[2], m[0] * n[1] + m[1] * n[3],
+        m[2] * n[0] + m[3] * n[2], m[2] * n[1] + m[3] * n[3],
+        m[4] * n[0] + m[5] * n[2] + n[4], m[4] * n[1] + m[5] * n[3] + n[5]
+    )
+
+
+def _translate(m: Matrix, tx: float, ty: float) -> Matrix:
+    return (m[0], m[1], m[2], m[3], tx * m[0] + ty * m[2] + m[4], tx * m[1] + ty * m[3] + m[5])
+
+
+class _Font:
+    """Decoding and glyph widths of a page font resource, decoded as PyPDF2's extract_text does."""
+
+    def __init__(self, name: str, page):
+        from PyPDF2._cmap import build_char_map
+
+        try:
+            subtype, _, self.encoding, self.char_map, font = build_char_map(name, 200.0, page)
+        except Exception:
+            # Missing or malformed font resource: show its bytes as Latin-1
+            subtype, self.encoding, self.char_map, font = "", "charmap", {}, {}
+        self.widths: Optional[List[float]] = None
+        self.first_char = 0
+        # Type0 fonts have multi-byte codes and widths in /W; those get the default
+        if subtype != "/Type0" and "/Widths" in font:
+            self.widths = [float(width) for width in font["/Widths"].get_object()]
+            self.first_char = int(font.get("/FirstChar", 0))
+
+    def decode(self, raw) -> str:
+        if isinstance(raw, str):
+            text = raw
+        elif isinstance(self.encoding, str):
+            try:
+                text = raw.decode(self.encoding, "surrogatepass")
+            except UnicodeDecodeError:
+                text = raw.decode("utf-16-be" if self.encoding == "charmap" else "charmap", "surrogatepass")
+        else:
+            text = "".join(self.encoding.get(code, chr(code)) for code in raw)
+        if self.char_map:
+            text = "".join(self.char_map.get(char, char) for char in text)
+        return text
+
+    def width(self, raw, text: str) -> float:
+        """Advance of the shown string in thousandths of an em."""
+        codes = getattr(raw, "original_bytes", raw)
+        if self.widths is None or not isinstance(codes, bytes):
+            return DEFAULT_GLYPH_WIDTH * len(text)
+        widths, first = self.widths, self.first_char
+        return sum(widths[code - first] if 0 <= code - first < len(widths) else DEFAULT_GLYPH_WIDTH for code in codes)
+
+
+def extract_page_runs(page) -> List[TextRun]:
+    """Positioned text runs of a PDF page, in content stream order.
+
+    Walks the page's content stream tracking the graphics and text state, so
+    each shown string gets the coordinates it is drawn at; extract_text only
+    returns the text. Strings drawn back to back make up one run. Text inside
+    form XObjects is not visited.
+    """
+    from PyPDF2.generic import ContentStream
+
+    contents = page.get_contents()
+    if contents is None:
+        return []
+    if not isinstance(contents, ContentStream):
+        contents = ContentStream(contents, page.pdf)
+
+    runs: List[TextRun] = []
+    fonts: Dict[str, _Font] = {}
+    font: Optional[_Font] = None
+    size = 0.0
+    ctm, tm, line = IDENTITY, IDENTITY, IDENTITY
+    saved: List[Matrix] = []
+    leading = char_spacing = word_spacing = 0.0
+    scale = 1.0
+
+    def show(items: Sequence) -> None:
+        nonlocal font, tm
+        if font is None:
+            # Text shown before any Tf
+            font = fonts[""] = _Font("", page)
+        start, parts = tm, []
+        for item in items:
+            if isinstance(item, (str, bytes)):
+                text = font.decode(item)
+                spaces = text.count(" ")
+                advance = (font.width(item, text) / 1000 * size + char_spacing * len(text) + word_spacing * spaces) * scale
+                parts.append(text)
+                tm = _translate(tm, advance, 0.0)
+                continue
+            adjustment = float(item)
+            if adjustment <= -TJ_RUN_BREAK and parts:
+                emit(start, parts)
+                parts = []
+            elif adjustment <= -TJ_SPACE and parts and not parts[-1].endswith(" "):
+                parts.append(" ")
+            tm = _translate(tm, -adjustment / 1000 * size * scale, 0.0)
+            if not parts:
+                start = tm
+        if parts:
+            emit(start, parts)
+
+    def emit(start: Matrix, parts: List[str]) -> None:
+        text = "".join(parts)
+        if not text.strip():
+            return
+        origin, end = _multiply(start, ctm), _multiply(tm, ctm)
+        runs.append(TextRun(
+            x=origin[4],
+            y=origin[5],
+            width=math.hypot(end[4] - origin[4], end[5] - origin[5]),
+            text=text.strip(),
+            size=size * math.hypot(origin[2], origin[3])
+        ))
+
+    for operands, operator in contents.operations:
+        if operator == b"q":
+            saved.append(ctm)
+        elif operator == b"Q":
+            ctm = saved.pop() if saved else IDENTITY
+        elif operator == b"cm":
+            ctm = _multiply(tuple(float(value) for value in operands), ctm)
+        elif operator == b"BT":
+            tm = line = IDENTITY
+        elif operator == b"Tf":
+            name = str(operands[0])
+            font = fonts.get(name)
+            if font is None:
+                font = fonts[name] = _Font(name, page)
+            size = float(operands[1])
+        elif operator == b"TL":
+            leading = float(operands[0])
+        elif operator == b"Tc":
+            char_spacing = float(operands[0])
+        elif operator == b"Tw":
+            word_spacing = float(operands[0])
+        elif operator == b"Tz":
+            scale = float(operands[0]) / 100
+        elif operator in (b"Td", b"TD"):
+            if operator == b"TD":
+                leading = -float(operands[1])
+            tm = line = _translate(line, float(operands[0]), float(operands[1]))
+        elif operator == b"Tm":
+            tm = line = tuple(float(value) for value in operands)
+        elif operator == b"T*":
+            tm = line = _translate(line, 0.0, -leading)
+        elif operator == b"Tj":
+            show(operands[:1])
+        elif operator == b"TJ":
+            show(operands[0])
+        elif operator == b"'":
+            tm = line = _translate(line, 0.0, -leading)
+            show(operands[:1])
+        elif operator == b'"':
+            word_spacing, char_spacing = float(operands[0]), float(operands[1])
+            tm = line = _translate(line, 0.0, -leading)
+            show(operands[2:3])
+    return runs
+
+
+def warm_up_worker() -> int:
+    """Import the PDF backend in a pool worker ahead of its first real job."""
+    import PyPDF2  # noqa: F401
+    return os.getpid()
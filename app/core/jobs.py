@@ -0,0 +1,308 @@
+import asyncio
+import os
+import socket
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models.models import Job
+
+MAILBOX_INGEST_JOB = "mailbox_ingest"
+REPROCESS_JOB = "reprocess"
+
+
+def worker_identity() -> str:
+    """host:pid, unique across the worker processes of every node."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """Database-backed job queue shared by every worker process and node.
+
+    A job is claimed by moving it from pending to running under a lease. On
+    PostgreSQL the candidate row is locked with SELECT ... FOR UPDATE SKIP LOCKED,
+    so concurrent claimers never wait on each other; on SQLite the claim is a
+    conditional UPDATE, which the database serializes. Either way exactly one
+    worker wins each job. A worker that dies stops renewing its lease and the job
+    becomes claimable again once the lease expires.
+    """
+
+    def __init__(self, lease_seconds: int = 60, max_attempts: int = 3):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def enqueue(self, db: Session, kind: str, payload: Dict[str, Any], dedup_key: Optional[str] = None) -> Job:
+        """Add a job, or return the unfinished job already queued under dedup_key."""
+        job = Job(kind=kind, payload=payload, status="pending", dedup_key=dedup_key)
+        db.add(job)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return db.scalars(select(Job).where(Job.kind == kind, Job.dedup_key == dedup_key)).one()
+        db.refresh(job)
+        return job
+
+    def _claimable(self, kinds: Iterable[str], now: datetime):
+        return and_(
+            Job.kind.in_(list(kinds)),
+            or_(
+                Job.status == "pending",
+                # Running under an expired lease: its worker died
+                and_(Job.status == "running", Job.lease_expires_at < now, Job.attempts < self.max_attempts)
+            )
+        )
+
+    def claim(self, db: Session, worker_id: str, kinds: Iterable[str], job_id: Optional[int] = None) -> Optional[Job]:
+        """Claim the oldest claimable job of the given kinds (or that exact job), or return None."""
+        kinds = list(kinds)
+        now = datetime.now(timezone.utc)
+
+        candidate = select(Job.id).where(self._claimable(kinds, now)).order_by(Job.id).limit(1)
+        if job_id is not None:
+            candidate = candidate.where(Job.id == job_id)
+        if db.bind.dialect.name != "sqlite":
+            candidate = candidate.with_for_update(skip_locked=True)
+        job_id = db.scalar(candidate)
+        if job_id is None:
+            db.rollback()
+            return None
+
+        # Compare-and-set: re-checks the claim condition, so a worker that lost
+        # the race updates nothing
+        claimed = db.execute(
+            update(Job)
+            .where(Job.id == job_id, self._claimable(kinds, now))
+            .values(
+                status="running",
+                worker_id=worker_id,
+                attempts=Job.attempts + 1,
+                started_at=now,
+                lease_expires_at=now + timedelta(seconds=self.lease_seconds)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        if claimed.rowcount != 1:
+            return None
+        return db.get(Job, job_id)
+
+    def reap(self, db: Session) -> int:
+        """Fail jobs whose worker died on every attempt, so their dedup key frees up."""
+        reaped = db.execute(
+            update(Job)
+            .where(
+                Job.status == "running",
+                Job.lease_expires_at < datetime.now(timezone.utc),
+                Job.attempts >= self.max_attempts
+            )
+            .values(status="failed", error="Lease expired", dedup_key=None, finished_at=datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return reaped.rowcount
+
+    def renew(self, db: Session, job_id: int, worker_id: str) -> bool:
+        """Extend the lease; False if this worker no longer holds the job."""
+        renewed = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.worker_id == worker_id, Job.status == "running")
+            .values(lease_expires_at=datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return renewed.rowcount == 1
+
+    def report(self, db: Session, job_id: int, worker_id: str, progress: Dict[str, Any]) -> bool:
+        """Publish a running job's progress; False if this worker no longer holds it."""
+        reported = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.worker_id == worker_id, Job.status == "running")
+            .values(progress=progress)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return reported.rowcount == 1
+
+    def finish(
+        self,
+        db: Session,
+        job_id: int,
+        worker_id: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ) -> bool:
+        """Record the outcome and release the dedup key; False if the claim was lost."""
+        finished = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.worker_id == worker_id, Job.status == "running")
+            .values(
+                status="failed" if error else "done",
+                result=result,
+                error=error,
+                dedup_key=None,
+                lease_expires_at=None,
+                finished_at=datetime.now(timezone.utc)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return finished.rowcount == 1
+
+
+def _with_session(fn: Callable[..., Any], *args: Any) -> Any:
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+class JobContext:
+    """Handed to a job handler: which job it runs, and how to publish its progress."""
+
+    def __init__(self, queue: JobQueue, job_id: int, worker_id: str, attempt: int):
+        self.queue = queue
+        self.job_id = job_id
+        self.worker_id = worker_id
+        # 1 on the first claim; higher when re-claimed after a worker died
+        self.attempt = attempt
+
+    def report(self, progress: Dict[str, Any]) -> bool:
+        return _with_session(self.queue.report, self.job_id, self.worker_id, progress)
+
+
+JobHandler = Callable[[Dict[str, Any], JobContext], Dict[str, Any]]
+
+
+class ClaimedJob(NamedTuple):
+    """What a worker keeps of a claimed job once its session is closed."""
+    id: int
+    kind: str
+    payload: Dict[str, Any]
+    attempt: int
+
+
+def run_job(
+    queue: JobQueue,
+    job_id: int,
+    kind: str,
+    handler: JobHandler,
+    worker_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Claim one job and run it in the calling thread, e.g. from a command-line tool."""
+    worker_id = worker_id or worker_identity()
+    job = _with_session(queue.claim, worker_id, [kind], job_id)
+    if job is None:
+        raise RuntimeError(f"Job {job_id} is not claimable")
+
+    # Keep the lease alive from a side thread while the handler blocks this one
+    done = threading.Event()
+
+    def keep_lease() -> None:
+        while not done.wait(queue.lease_seconds / 3):
+            _with_session(queue.renew, job_id, worker_id)
+
+    threading.Thread(target=keep_lease, daemon=True).start()
+    try:
+        result = handler(job.payload, JobContext(queue, job_id, worker_id, job.attempts))
+    except BaseException as e:
+        done.set()
+        _with_session(queue.finish, job_id, worker_id, None, str(e) or type(e).__name__)
+        raise
+    done.set()
+    _with_session(queue.finish, job_id, worker_id, result)
+    return result
+
+
+class JobWorker:
+    """Polls the JobQueue from inside a web worker and runs claimed jobs on a thread.
+
+    Runs one job at a time per process; handlers that need more parallelism (such
+    as the mailbox ingest) bring their own process pool.
+    """
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, JobHandler], poll_interval: float = 1.0):
+        self.queue = queue
+        self.handlers = handlers
+        self.poll_interval = poll_interval
+        self.worker_id = worker_identity()
+        self.current_job: Optional[int] = None
+        self.completed = 0
+        self.failed = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def _claim(self) -> Optional[ClaimedJob]:
+        job = _with_session(self.queue.claim, self.worker_id, self.handlers)
+        if job is None:
+            return None
+        return ClaimedJob(job.id, job.kind, job.payload, job.attempts)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_reap = loop.time()
+        while True:
+            if loop.time() >= next_reap:
+                next_reap = loop.time() + self.queue.lease_seconds
+                try:
+                    await asyncio.to_thread(_with_session, self.queue.reap)
+                except Exception:
+                    pass
+            try:
+                job = await asyncio.to_thread(self._claim)
+            except Exception:
+                # Database briefly unavailable or locked; try again next poll
+                job = None
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            await self._execute(job)
+
+    async def _keep_lease(self, job_id: int) -> None:
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            await asyncio.to_thread(_with_session, self.queue.renew, job_id, self.worker_id)
+
+    async def _execute(self, job: ClaimedJob) -> None:
+        self.current_job = job.id
+        lease = asyncio.get_running_loop().create_task(self._keep_lease(job.id))
+        result, error = None, None
+        try:
+            context = JobContext(self.queue, job.id, self.worker_id, job.attempt)
+            result = await asyncio.to_thread(self.handlers[job.kind], job.payload, context)
+        except Exception as e:
+            # An exception without a message must still mark the job failed
+            error = str(e) or type(e).__name__
+        finally:
+            lease.cancel()
+            self.current_job = None
+
+        await asyncio.to_thread(_with_session, self.queue.finish, job.id, self.worker_id, result, error)
+        if error:
+            self.failed += 1
+        else:
+            self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "current_job": self.current_job,
+            "completed": self.completed,
+            "failed": self.failed
+        }
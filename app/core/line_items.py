@@ -0,0 +1,221 @@
+import io
+import re
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.core.extraction import TextRun, extract_page_runs
+
+# Header cell text -> the line item field its column holds
+HEADER_ROLES = {
+    "description": "description", "item": "description", "items": "description", "product": "description",
+    "service": "description", "services": "description", "details": "description", "particulars": "description",
+    "qty": "quantity", "quantity": "quantity", "units": "quantity", "hours": "quantity", "hrs": "quantity",
+    "unit price": "unit_price", "price": "unit_price", "rate": "unit_price", "unit cost": "unit_price",
+    "each": "unit_price", "amount": "amount", "total": "amount", "line total": "amount", "net amount": "amount"
+}
+
+# Label rows that close the item table: a label followed only by figures
+STOP_ROW = re.compile(
+    r"^(?:sub[\s-]?total|total|grand total|total due|amount due|balance(?: due)?|tax|sales tax|vat|gst)\b[^a-z]*$",
+    re.IGNORECASE
+)
+
+AMOUNT = re.compile(r"^(\()?\s*(-)?\s*[$€£]?\s*(-)?\s*((?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?)\s*\)?$")
+
+# Runs whose baselines differ by less than this share of their font size are one row
+ROW_TOLERANCE = 0.4
+# Runs closer than this share of the font size are words of one cell
+WORD_GAP = 0.6
+# Furthest (in font sizes) a wrapped description line sits below the row before it
+CONTINUATION_GAP = 2.5
+# Most words a line of extracted text can have and still be read as a table header
+MAX_HEADER_WORDS = 10
+
+
+class LineItem(NamedTuple):
+    page: int
+    description: str
+    quantity: Optional[float]
+    unit_price: Optional[float]
+    amount: float
+
+
+class _Column(NamedTuple):
+    role: Optional[str]
+    left: float
+    right: float
+
+
+def parse_amount(text: str) -> Optional[float]:
+    """A figure such as "1,425.15", "$12", "-3.50" or "(3.50)", or None."""
+    match = AMOUNT.match(text.strip())
+    if match is None:
+        return None
+    value = float(match.group(4).replace(",", ""))
+    return -value if match.group(1) or match.group(2) or match.group(3) else value
+
+
+def group_rows(runs: Sequence[TextRun]) -> List[List[TextRun]]:
+    """Group runs into rows, top to bottom, each row ordered left to right.
+
+    Sort-and-sweep: runs are sorted by baseline once, then a sweep starts a new
+    row whenever a baseline falls more than ROW_TOLERANCE of its font size
+    below the first run of the current row.
+    """
+    rows: List[List[TextRun]] = []
+    row: List[TextRun] = []
+    for run in sorted(runs, key=lambda run: -run.y):
+        if row and row[0].y - run.y > ROW_TOLERANCE * max(run.size, 1.0):
+            rows.append(row)
+            row = []
+        row.append(run)
+    if row:
+        rows.append(row)
+    return [_merge_words(sorted(row, key=lambda run: run.x)) for row in rows]
+
+
+def _merge_words(row: List[TextRun]) -> List[TextRun]:
+    """Join runs drawn word by word into one run per cell."""
+    merged = [row[0]]
+    for run in row[1:]:
+        last = merged[-1]
+        if run.x - (last.x + last.width) < WORD_GAP * max(last.size, 1.0):
+            merged[-1] = last._replace(width=run.x + run.width - last.x, text=f"{last.text} {run.text}")
+        else:
+            merged.append(run)
+    return merged
+
+
+def _role(text: str) -> Optional[str]:
+    words = re.sub(r"[^a-z ]", " ", text.lower()).split()
+    for key in (" ".join(words), " ".join(words[:2]), " ".join(words[:1])):
+        if key in HEADER_ROLES:
+            return HEADER_ROLES[key]
+    return None
+
+
+def _header_columns(row: List[TextRun]) -> Optional[List[_Column]]:
+    """The columns a table header row defines, or None if row is not a header."""
+    roles = [_role(run.text) for run in row]
+    if "amount" not in roles or sum(role is not None for role in roles) < 2:
+        return None
+    return [_Column(role, run.x, run.x + run.width) for role, run in zip(roles, row)]
+
+
+def _is_header_text(text: str) -> bool:
+    """Whether a line of text is a table header drawn as a single run."""
+    words = re.sub(r"[^a-z ]", " ", text.lower()).split()
+    roles = {HEADER_ROLES.get(word) for word in words} | {HEADER_ROLES.get(" ".join(pair)) for pair in zip(words, words[1:])}
+    roles.discard(None)
+    return "amount" in roles and len(roles) >= 2
+
+
+def has_table_header(text: str) -> bool:
+    """Whether extracted text has a line that reads as an item table header.
+
+    A cheap check on text already extracted, so only documents with a table
+    pay for walking their content streams.
+    """
+    return any(len(line.split()) <= MAX_HEADER_WORDS and _is_header_text(line) for line in text.splitlines())
+
+
+def _column_of(run: TextRun, columns: List[_Column]) -> _Column:
+    """The column whose header overlaps the run most, else the one nearest to it."""
+    def fit(column: _Column) -> Tuple[float, float]:
+        overlap = min(run.x + run.width, column.right) - max(run.x, column.left)
+        return (overlap, 0.0) if overlap > 0 else (0.0, overlap)
+    return max(columns, key=fit)
+
+
+def _from_columns(row: List[TextRun], columns: List[_Column]) -> Dict[str, str]:
+    cells: Dict[str, List[str]] = {}
+    for run in row:
+        role = _column_of(run, columns).role
+        if role is not None:
+            cells.setdefault(role, []).append(run.text)
+    return {role: " ".join(texts) for role, texts in cells.items()}
+
+
+def _from_tokens(row: List[TextRun]) -> Dict[str, str]:
+    """Cells of a row drawn as one string: up to three trailing figures, after the description."""
+    tokens = " ".join(run.text for run in row).split()
+    figures = []
+    while tokens and len(figures) < 3 and parse_amount(tokens[-1]) is not None:
+        figures.insert(0, tokens.pop())
+    cells = {"description": " ".join(tokens)}
+    if len(figures) < 2:
+        return cells
+    if len(figures) == 3:
+        cells["quantity"], cells["unit_price"] = figures[0], figures[1]
+    elif "." in figures[0]:
+        cells["unit_price"] = figures[0]
+    else:
+        cells["quantity"] = figures[0]
+    cells["amount"] = figures[-1]
+    return cells
+
+
+def page_line_items(runs: Sequence[TextRun], page: int) -> List[LineItem]:
+    """Line items of the item table on one page.
+
+    Rows below a header row are split into cells by the header's columns; a
+    page without a header (a continuation page, or rows drawn as one string
+    each) falls back to reading trailing figures off each row. The table ends
+    at a subtotal, tax or total row. A row with text but no amount continues
+    the previous item's description.
+    """
+    rows = group_rows(runs)
+    headers = [_header_columns(row) for row in rows]
+    text_headers = [len(row) == 1 and _is_header_text(row[0].text) for row in rows]
+    # Rows above the table (addresses, invoice number) only count once a header is seen
+    in_table = not any(headers) and not any(text_headers)
+
+    columns: Optional[List[_Column]] = None
+    items: List[LineItem] = []
+    last_y = 0.0
+    for row, header, text_header in zip(rows, headers, text_headers):
+        if header or text_header:
+            columns, in_table = header, True
+            continue
+        if not in_table:
+            continue
+        cells = _from_columns(row, columns) if columns else _from_tokens(row)
+        description = cells.get("description", "")
+        if STOP_ROW.match(description) or any(STOP_ROW.match(run.text) for run in row):
+            columns, in_table = None, False
+            continue
+
+        amount = parse_amount(cells.get("amount", ""))
+        if amount is None:
+            # Wrapped description lines sit right under their item, footers don't
+            if items and description and len(cells) == 1 and last_y - row[0].y <= CONTINUATION_GAP * row[0].size:
+                items[-1] = items[-1]._replace(description=f"{items[-1].description} {description}")
+                last_y = row[0].y
+            continue
+        last_y = row[0].y
+        items.append(LineItem(
+            page=page,
+            description=description,
+            quantity=parse_amount(cells.get("quantity", "")),
+            unit_price=parse_amount(cells.get("unit_price", "")),
+            amount=amount
+        ))
+    return items
+
+
+def extract_line_items(content: bytes, start: int = 0, stop: Optional[int] = None) -> List[LineItem]:
+    """Line items on pages start..stop of a PDF.
+
+    Each page is read on its own, so page ranges of one document can be handed
+    to separate process pool workers. Every call opens the PDF again, reading
+    its cross-reference table, but decodes only the content streams of its
+    own pages.
+    """
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
+    pages = pdf_reader.pages[start:stop]
+    return [
+        item
+        for number, page in enumerate(pages, start + 1)
+        for item in page_line_items(extract_page_runs(page), number)
+    ]
@@ -0,0 +1,72 @@
+"""Compact result records for agent outputs held in memory in bulk.
+
+Bulk ingest and reprocessing keep thousands of results alive between a worker
+process and the database insert. NamedTuples carry no per-instance __dict__ and
+pickle as bare values, so each record costs a fraction of the equivalent dict.
+Label fields (tone, urgency, intent) hold the interned strings of the RuleSet
+that produced them, so a batch of records shares a single copy of each label.
+"""
+import sys
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+
+# Each file type's preview field, stored out of line in file_metadata.preview
+PREVIEW_FIELDS = {"PDF": "preview", "Email": "content_preview", "Text": "summary"}
+
+PREVIEW_CHARS = 200
+
+
+def intern_label(value: Optional[str]) -> Optional[str]:
+    """The one shared copy of a label string repeated across many results."""
+    return sys.intern(value) if value is not None else None
+
+
+def preview(text: str, limit: int = PREVIEW_CHARS) -> str:
+    return text[:limit] + "..." if len(text) > limit else text
+
+
+def with_preview(file_type: str, result: Optional[Dict[str, Any]], preview_text: Optional[str]) -> Optional[Dict[str, Any]]:
+    """A stored result with its out-of-line preview put back under the field the API returns."""
+    field = PREVIEW_FIELDS.get(file_type)
+    if result is None or field is None or preview_text is None:
+        return result
+    return {**result, field: preview_text}
+
+
+class EmailAnalysis(NamedTuple):
+    sender_email: str
+    tone: str
+    urgency: str
+    is_escalated: bool
+    rules_version: int
+
+
+class PdfAnalysis(NamedTuple):
+    total_amount: Optional[float]
+    is_high_value: bool
+    has_gdpr: bool
+    has_fda: bool
+    rules_version: int
+
+
+class JsonAnalysis(NamedTuple):
+    schema_valid: bool
+    anomalies: List[str]
+
+
+class IngestedEmail(NamedTuple):
+    """One analyzed mailbox message on its way from a worker process to the database."""
+    key: str
+    sender_email: str
+    tone: str
+    urgency: str
+    is_escalated: bool
+    rules_version: int
+    business_intent: str
+    received_at: Optional[datetime]
+    body: bytes  # zlib-compressed text for the search index
+
+    @property
+    def text(self) -> str:
+        return zlib.decompress(self.body).decode("utf-8")
@@ -0,0 +1,231 @@
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Pattern, Tuple
+
+from app.core.records import intern_label
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rules.json")
+
+
+def _keyword_pattern(keywords: List[str], flags: int = re.IGNORECASE) -> Pattern[str]:
+    """One alternation for a keyword list, so a text is scanned once instead of per keyword."""
+    # Longest first, so a keyword is never shadowed by one of its prefixes
+    return re.compile("|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True)), flags)
+
+
+def _keyword_groups(groups: Dict[str, List[str]]) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    if not groups or not all(isinstance(keywords, list) and keywords for keywords in groups.values()):
+        raise ValueError("Keyword groups must map each label to a non-empty list")
+    # Labels end up in every result, so all results share one interned copy of each
+    return tuple((intern_label(label), tuple(k.lower() for k in keywords)) for label, keywords in groups.items())
+
+
+@dataclass(frozen=True)
+class KeywordScorer:
+    """Picks the label with the most distinct keywords present; ties go to the earlier label.
+
+    Tone and urgency lists are short, and a `keyword in text` per keyword beats
+    one alternation regex over the text by about 3x, so these stay plain loops.
+    """
+    groups: Tuple[Tuple[str, Tuple[str, ...]], ...]
+
+    def best(self, text_lower: str) -> str:
+        return max(
+            ((label, sum(1 for keyword in keywords if keyword in text_lower)) for label, keywords in self.groups),
+            key=lambda scored: scored[1]
+        )[0]
+
+    def hits(self, label: str, text_lower: str) -> int:
+        """How many of one label's keywords text_lower contains."""
+        return sum(
+            1 for group, keywords in self.groups if group == label for keyword in keywords if keyword in text_lower
+        )
+
+    def as_dict(self) -> Dict[str, List[str]]:
+        return {label: list(keywords) for label, keywords in self.groups}
+
+
+@dataclass(frozen=True)
+class ClassifierRules:
+    intents: Tuple[Tuple[str, Tuple[str, ...]], ...]  # checked in order
+    default_intent: str
+    # Per intent, a bytes alternation of its keywords, for raw document bytes
+    byte_matchers: Tuple[Tuple[str, Pattern[bytes]], ...]
+
+    def intent_for(self, content: bytes) -> str:
+        for intent, matcher in self.byte_matchers:
+            if matcher.search(content):
+                return intent
+        return self.default_intent
+
+    def intent_keywords(self) -> Dict[str, List[str]]:
+        return {intent: list(keywords) for intent, keywords in self.intents}
+
+
+@dataclass(frozen=True)
+class PdfRules:
+    high_value_threshold: float
+    regulation_keywords: Mapping[str, Tuple[str, ...]]
+    regulation_matchers: Mapping[str, Pattern[str]]
+    total_amount_patterns: Tuple[Pattern[str], ...]
+
+
+@dataclass(frozen=True)
+class EmailRules:
+    tone: KeywordScorer
+    urgency: KeywordScorer
+    escalate_tone: str
+    escalate_urgency: str
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    """One immutable, fully compiled version of the rules file.
+
+    Agents take a single RuleSet per document, so a reload in the middle of a
+    document never mixes two versions, and nothing is compiled per request.
+    """
+    version: int
+    classifier: ClassifierRules
+    pdf: PdfRules
+    email: EmailRules
+    source: str  # the file's JSON, for reporting which rules produced a result
+
+    @classmethod
+    def compile(cls, data: Dict[str, Any]) -> "RuleSet":
+        """Validate and compile parsed rules; raises ValueError on a bad file."""
+        try:
+            version = int(data["version"])
+            classifier, pdf, email = data["classifier"], data["pdf"], data["email"]
+
+            intents = _keyword_groups(classifier["intent_keywords"])
+            classifier_rules = ClassifierRules(
+                intents=intents,
+                default_intent=intern_label(classifier["default_intent"]),
+                byte_matchers=tuple(
+                    (intent, re.compile(_keyword_pattern(list(keywords)).pattern.encode(), re.IGNORECASE))
+                    for intent, keywords in intents
+                )
+            )
+
+            regulations = dict(_keyword_groups(pdf["regulation_keywords"]))
+            pdf_rules = PdfRules(
+                high_value_threshold=float(pdf["high_value_threshold"]),
+                regulation_keywords=MappingProxyType(regulations),
+                regulation_matchers=MappingProxyType(
+                    {name: _keyword_pattern(list(keywords)) for name, keywords in regulations.items()}
+                ),
+                total_amount_patterns=tuple(re.compile(p, re.IGNORECASE) for p in pdf["total_amount_patterns"])
+            )
+
+            email_rules = EmailRules(
+                tone=KeywordScorer(_keyword_groups(email["tone_keywords"])),
+                urgency=KeywordScorer(_keyword_groups(email["urgency_keywords"])),
+                escalate_tone=intern_label(email["escalate_when"]["tone"]),
+                escalate_urgency=intern_label(email["escalate_when"]["urgency"])
+            )
+        except (KeyError, TypeError, re.error) as e:
+            raise ValueError(f"Invalid rules: {e!r}") from e
+
+        return cls(
+            version=version,
+            classifier=classifier_rules,
+            pdf=pdf_rules,
+            email=email_rules,
+            source=json.dumps(data, sort_keys=True)
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        return json.loads(self.source)
+
+
+class RuleStore:
+    """Holds the current RuleSet and swaps in a new one when the rules file changes.
+
+    Readers just dereference `current`; a reload compiles the new RuleSet on the
+    side (the watcher thread or a reload() caller) and publishes it with a single
+    reference assignment, so requests never wait on a reload. A file that fails
+    to parse or compile is rejected and the previous rules stay in force, as is
+    one that changes the rules without raising their version: results are keyed
+    by rules_version, so two rule sets must never share one.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.environ.get("RULES_PATH", DEFAULT_RULES_PATH)
+        self._current: Optional[RuleSet] = None
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def current(self) -> RuleSet:
+        rules = self._current
+        if rules is None:
+            rules = self.reload()
+        return rules
+
+    def reload(self) -> RuleSet:
+        """Load and compile the rules file, then swap it in. Raises ValueError if invalid."""
+        # One compiler at a time; readers are never blocked by this lock
+        with self._lock:
+            mtime = os.stat(self.path).st_mtime
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    rules = RuleSet.compile(json.load(f))
+                current = self._current
+                if current is not None and rules.source != current.source and rules.version <= current.version:
+                    raise ValueError(f"Rules changed but version {rules.version} is not above {current.version}")
+            except ValueError as e:
+                self._mtime = mtime
+                self.last_error = str(e)
+                raise ValueError(f"{self.path}: {e}") from e
+            self._current = rules
+            self._mtime = mtime
+            self.reloads += 1
+            self.last_error = None
+            return rules
+
+    def _changed(self) -> bool:
+        try:
+            return os.stat(self.path).st_mtime != self._mtime
+        except FileNotFoundError:
+            return False
+
+    def watch(self, interval: float = 2.0) -> None:
+        """Poll the file's mtime from a daemon thread and reload when it changes."""
+        if self._watcher is not None:
+            return
+        self.current
+
+        def run() -> None:
+            while not self._stop.wait(interval):
+                if self._changed():
+                    try:
+                        self.reload()
+                    except (OSError, ValueError):
+                        pass
+
+        self._watcher = threading.Thread(target=run, name="rules-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "version": self._current.version if self._current else None,
+            "reloads": self.reloads,
+            "last_error": self.last_error
+        }
+
+
+# Process-wide rules shared by every agent
+rule_store = RuleStore()
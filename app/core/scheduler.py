@@ -0,0 +1,158 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+URGENT = "urgent"
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+# Share of slots each class gets while all of them are waiting
+DEFAULT_WEIGHTS = {URGENT: 8.0, INTERACTIVE: 4.0, BULK: 1.0}
+
+# A queued acquire: (virtual finish tag, when it was queued, the future that grants it)
+Waiter = Tuple[float, float, "asyncio.Future[None]"]
+
+
+class PriorityScheduler:
+    """Hands out a fixed number of slots to waiters by weighted fair queuing.
+
+    Each priority class has a FIFO queue and a weight. A waiter is stamped with a
+    virtual finish time, start + 1 / weight, where start is the later of the
+    scheduler's virtual clock and the finish time of the last waiter queued in
+    its class; a freed slot goes to the queue head with the earliest finish
+    time. With every class backlogged, class c therefore gets weight(c) / sum of
+    weights of the slots, so a bulk backfill keeps moving while urgent items
+    pass it. A head that has waited longer than max_wait seconds is served
+    first, whatever its class, so no class can starve. Must be used from a
+    single event loop.
+    """
+
+    def __init__(self, slots: int, weights: Optional[Dict[str, float]] = None, max_wait: float = 10.0):
+        self.slots = slots
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self.max_wait = max_wait
+        self.active = 0
+        self._virtual_time = 0.0
+        self._last_finish = {name: 0.0 for name in self.weights}
+        self._queues: Dict[str, Deque[Waiter]] = {name: deque() for name in self.weights}
+        self._granted = {name: 0 for name in self.weights}
+        self._promoted = {name: 0 for name in self.weights}
+        self._wait_total = {name: 0.0 for name in self.weights}
+        self._wait_max = {name: 0.0 for name in self.weights}
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _stamp(self, priority: str) -> float:
+        start = max(self._virtual_time, self._last_finish[priority])
+        finish = start + 1.0 / self.weights[priority]
+        self._last_finish[priority] = finish
+        return finish
+
+    def _record(self, priority: str, queued_at: float) -> None:
+        waited = time.monotonic() - queued_at
+        self._granted[priority] += 1
+        self._wait_total[priority] += waited
+        self._wait_max[priority] = max(self._wait_max[priority], waited)
+
+    async def acquire(self, priority: str) -> None:
+        if priority not in self.weights:
+            raise ValueError(f"Unknown priority class: {priority}")
+        finish = self._stamp(priority)
+        if self.active < self.slots and not self.waiting:
+            self.active += 1
+            self._virtual_time = finish - 1.0 / self.weights[priority]
+            self._record(priority, time.monotonic())
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (finish, time.monotonic(), future)
+        self._queues[priority].append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as it was cancelled: hand the slot on
+                self.release()
+            elif waiter in self._queues[priority]:
+                self._queues[priority].remove(waiter)
+            raise
+
+    def take_idle(self, count: int) -> int:
+        """Take up to count free slots without queueing, none while anyone waits.
+
+        Returns how many were taken; each must be given back with release().
+        """
+        if self.waiting:
+            return 0
+        taken = max(0, min(count, self.slots - self.active))
+        self.active += taken
+        return taken
+
+    def release(self) -> None:
+        self.active -= 1
+        self._dispatch()
+
+    def _next(self) -> Optional[str]:
+        heads = [(name, queue[0]) for name, queue in self._queues.items() if queue]
+        if not heads:
+            return None
+        now = time.monotonic()
+        starved = [(queued_at, name) for name, (_, queued_at, _) in heads if now - queued_at >= self.max_wait]
+        if starved:
+            name = min(starved)[1]
+            self._promoted[name] += 1
+            return name
+        return min(heads, key=lambda head: head[1][0])[0]
+
+    def _dispatch(self) -> None:
+        while self.active < self.slots:
+            name = self._next()
+            if name is None:
+                return
+            finish, queued_at, future = self._queues[name].popleft()
+            if future.done():
+                continue
+            self.active += 1
+            # The clock advances to the start tag of whatever is served
+            self._virtual_time = max(self._virtual_time, finish - 1.0 / self.weights[name])
+            self._record(name, queued_at)
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: str) -> AsyncIterator[None]:
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        classes: Dict[str, Dict[str, Any]] = {}
+        for name, queue in self._queues.items():
+            granted = self._granted[name]
+            classes[name] = {
+                "weight": self.weights[name],
+                "waiting": len(queue),
+                "granted": granted,
+                "promoted": self._promoted[name],
+                "avg_wait_ms": round(self._wait_total[name] / granted * 1000, 2) if granted else 0.0,
+                "max_wait_ms": round(self._wait_max[name] * 1000, 2)
+            }
+        return {"slots": self.slots, "active": self.active, "classes": classes}
+
+
+def parse_weights(value: Optional[str]) -> Dict[str, float]:
+    """Weights from a "urgent=8,interactive=4,bulk=1" string, defaults for any left out."""
+    weights = dict(DEFAULT_WEIGHTS)
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        name, _, weight = item.partition("=")
+        if name not in weights or not weight:
+            raise ValueError(f"Invalid priority weight: {item}")
+        weights[name] = float(weight)
+        if weights[name] <= 0:
+            raise ValueError(f"Priority weights must be positive: {item}")
+    return weights
@@ -0,0 +1,248 @@
+import asyncio
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, TypedDict
+
+from sqlalchemy import bindparam, create_engine, event, text
+
+# Bodies beyond this are indexed truncated; keeps one huge PDF from bloating the index
+MAX_INDEXED_CHARS = 1_000_000
+
+# Quoted phrases, or single terms (an optional trailing * makes a prefix query)
+QUERY_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+class IndexedDocument(TypedDict):
+    file_id: int
+    filename: str
+    file_type: str
+    business_intent: str
+    body: str
+
+
+def _quote(phrase: str) -> str:
+    return '"' + phrase.replace('"', '""') + '"'
+
+
+def build_match_query(query: str) -> str:
+    """Turn a user query into a safe FTS5 MATCH expression.
+
+    "quoted text" is a phrase, other words are terms, word* is a prefix and all
+    of them must match. Everything is quoted, so FTS5 operators and punctuation in
+    the query can never cause a syntax error.
+    """
+    parts = []
+    for phrase, word in QUERY_TOKEN.findall(query):
+        if phrase.strip():
+            parts.append(_quote(phrase))
+        elif word:
+            prefix = word.endswith("*") and len(word) > 1
+            word = word.rstrip("*").replace('"', "")
+            if word:
+                parts.append(_quote(word) + ("*" if prefix else ""))
+    return " ".join(parts)
+
+
+class SearchIndex:
+    """Full-text index of extracted document content in a SQLite FTS5 table.
+
+    Lives in its own database file, so indexing never holds the write lock of
+    the main database. The FTS rowid is the file_metadata id, which makes
+    re-indexing a document a plain INSERT OR REPLACE. file_type and
+    business_intent are indexed columns, so filters are resolved by the index
+    rather than by scanning matches. A one-row table keeps the document count,
+    since count(*) on an FTS5 table reads all of it.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.environ.get("SEARCH_INDEX_PATH", "./search_index.db")
+        self.engine = create_engine(f"sqlite:///{self.path}", connect_args={"check_same_thread": False, "timeout": 30})
+        event.listen(self.engine, "connect", self._configure)
+        self._initialized = False
+
+    @staticmethod
+    def _configure(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    def init(self) -> None:
+        if self._initialized:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS document_search USING fts5("
+                "body, filename, file_type, business_intent, tokenize = 'unicode61 remove_diacritics 2')"
+            ))
+            conn.execute(text("CREATE TABLE IF NOT EXISTS document_count (id INTEGER PRIMARY KEY CHECK (id = 1), value INTEGER NOT NULL)"))
+            # Counted once for an index created before the counter existed
+            conn.execute(text(
+                "INSERT OR IGNORE INTO document_count(id, value) SELECT 1, count(*) FROM document_search"
+            ))
+        self._initialized = True
+
+    def _add_to_count(self, conn: Any, delta: int) -> None:
+        if delta:
+            conn.execute(text("UPDATE document_count SET value = value + :delta WHERE id = 1"), {"delta": delta})
+
+    def add_many(self, documents: Iterable[IndexedDocument]) -> int:
+        """Index (or re-index) documents in one transaction. Returns how many."""
+        rows = [
+            {
+                "file_id": document["file_id"],
+                "body": document["body"][:MAX_INDEXED_CHARS],
+                "filename": document["filename"],
+                "file_type": document["file_type"],
+                "business_intent": document["business_intent"] or ""
+            }
+            for document in documents
+        ]
+        if not rows:
+            return 0
+        self.init()
+        file_ids = list({row["file_id"] for row in rows})
+        with self.engine.begin() as conn:
+            # Rowid lookups: only documents not indexed before add to the count
+            existing = conn.execute(
+                text("SELECT count(*) FROM document_search WHERE rowid IN :ids").bindparams(
+                    bindparam("ids", expanding=True)
+                ),
+                {"ids": file_ids}
+            ).scalar_one()
+            conn.execute(text(
+                "INSERT OR REPLACE INTO document_search(rowid, body, filename, file_type, business_intent) "
+                "VALUES (:file_id, :body, :filename, :file_type, :business_intent)"
+            ), rows)
+            self._add_to_count(conn, len(file_ids) - existing)
+        return len(rows)
+
+    def remove_filename(self, filename: str) -> None:
+        """Drop every indexed document stored under filename."""
+        self.init()
+        with self.engine.begin() as conn:
+            removed = conn.execute(text(
+                "DELETE FROM document_search WHERE rowid IN ("
+                "SELECT rowid FROM document_search WHERE document_search MATCH :match) AND filename = :filename"
+            ), {"match": "filename : " + _quote(filename), "filename": filename}).rowcount
+            self._add_to_count(conn, -removed)
+
+    def search(
+        self,
+        query: str,
+        file_type: Optional[str] = None,
+        business_intent: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """Ranked matches with highlighted snippets, best first."""
+        match = build_match_query(query)
+        if not match:
+            return []
+        # Column filters go into MATCH itself so the index narrows them
+        if file_type:
+            match = f"file_type : {_quote(file_type)} AND ({match})"
+        if business_intent:
+            match = f"business_intent : {_quote(business_intent)} AND ({match})"
+
+        self.init()
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT rowid, filename, file_type, business_intent, "
+                # Filename hits count double; the filter columns don't affect rank
+                "bm25(document_search, 1.0, 2.0, 0.0, 0.0) AS score, "
+                "snippet(document_search, 0, '<mark>', '</mark>', '...', 16) AS snippet "
+                "FROM document_search WHERE document_search MATCH :match "
+                "ORDER BY score LIMIT :limit OFFSET :offset"
+            ), {"match": match, "limit": limit, "offset": offset}).all()
+
+        return [
+            {
+                "file_id": row.rowid,
+                "filename": row.filename,
+                "file_type": row.file_type,
+                "business_intent": row.business_intent,
+                "score": -row.score,
+                "snippet": row.snippet
+            }
+            for row in rows
+        ]
+
+    def get_bodies(self, file_ids: List[int]) -> Dict[int, str]:
+        """Indexed text of the given documents, by file id (missing ones are left out)."""
+        if not file_ids:
+            return {}
+        self.init()
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text("SELECT rowid, body FROM document_search WHERE rowid IN :ids").bindparams(
+                    bindparam("ids", expanding=True)
+                ),
+                {"ids": file_ids}
+            ).all()
+        return {row.rowid: row.body for row in rows}
+
+    def count(self) -> int:
+        """Documents in the index, read from the counter rather than counted."""
+        self.init()
+        with self.engine.connect() as conn:
+            return conn.execute(text("SELECT value FROM document_count WHERE id = 1")).scalar_one()
+
+
+class SearchIndexer:
+    """Batches documents for the SearchIndex off the request path.
+
+    submit() only appends to an in-memory buffer; a background task writes the
+    buffer in one transaction every flush_interval seconds, or as soon as
+    batch_size documents are waiting.
+    """
+
+    def __init__(self, index: SearchIndex, batch_size: int = 200, flush_interval: float = 1.0):
+        self.index = index
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.indexed = 0
+        self.failed = 0
+        self._buffer: List[IndexedDocument] = []
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task, writing out anything still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+
+    def submit(self, document: IndexedDocument) -> None:
+        self._buffer.append(document)
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    async def flush(self) -> None:
+        batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        try:
+            self.indexed += await asyncio.to_thread(self.index.add_many, batch)
+        except Exception:
+            # The search index is derived data; losing a batch must not break uploads
+            self.failed += len(batch)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"pending": len(self._buffer), "indexed": self.indexed, "failed": self.failed}
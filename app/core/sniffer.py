@@ -0,0 +1,121 @@
+import codecs
+import os
+import re
+from typing import Tuple
+
+# Only this many leading bytes are ever inspected, whatever the file size
+SNIFF_BYTES = 4096
+
+EXTENSION_TYPES = {
+    ".pdf": "PDF",
+    ".json": "JSON",
+    ".eml": "Email",
+    ".msg": "Email",
+    ".txt": "Text",
+    ".zip": "ZIP"
+}
+
+KNOWN_EMAIL_HEADERS = {
+    "from", "to", "cc", "subject", "date", "message-id", "mime-version", "received",
+    "return-path", "reply-to", "delivered-to", "content-type", "in-reply-to", "references"
+}
+
+HEADER_LINE = re.compile(rb"^([A-Za-z0-9][A-Za-z0-9-]*):[ \t]")
+
+
+def _sniff_email(prefix: bytes) -> float:
+    """Confidence that the prefix starts with an RFC 822 header block."""
+    lines = prefix.split(b"\n")
+    if len(prefix) >= SNIFF_BYTES:
+        # The last line may have been cut off by the prefix bound
+        lines = lines[:-1]
+    if lines and lines[0].startswith(b"From "):
+        # mbox separator line in front of the headers
+        lines = lines[1:]
+
+    known = 0
+    headers = 0
+    for line in lines:
+        line = line.rstrip(b"\r")
+        if not line:
+            break
+        if line[:1] in (b" ", b"\t"):
+            # Folded continuation of the previous header
+            if headers == 0:
+                return 0.0
+            continue
+        match = HEADER_LINE.match(line)
+        if not match:
+            return 0.0
+        headers += 1
+        if match.group(1).decode("ascii").lower() in KNOWN_EMAIL_HEADERS:
+            known += 1
+
+    if known == 0:
+        return 0.0
+    return min(0.95, 0.5 + 0.15 * known)
+
+
+def _looks_like_text(prefix: bytes) -> bool:
+    """UTF-8 that is almost entirely printable."""
+    try:
+        # final=False tolerates a multi-byte character split by the prefix bound
+        text = codecs.getincrementaldecoder("utf-8")().decode(prefix, final=False)
+    except UnicodeDecodeError:
+        return False
+    if not text:
+        return False
+    printable = sum(1 for ch in text if ch.isprintable() or ch in "\r\n\t")
+    return printable / len(text) > 0.95
+
+
+def sniff_content(prefix: bytes) -> Tuple[str, float]:
+    """Guess the file type from its leading bytes. Returns (type, confidence 0..1).
+
+    Looks only at the first SNIFF_BYTES bytes and never parses the document.
+    """
+    prefix = prefix[:SNIFF_BYTES]
+
+    if prefix.startswith(b"%PDF-"):
+        return "PDF", 1.0
+    if b"%PDF-" in prefix[:1024]:
+        # The PDF spec tolerates junk before the header
+        return "PDF", 0.9
+    if prefix.startswith((b"PK\x03\x04", b"PK\x05\x06")):
+        return "ZIP", 0.95
+
+    stripped = prefix.lstrip(codecs.BOM_UTF8).lstrip()
+    if stripped[:1] in (b"{", b"["):
+        second = stripped[1:].lstrip()[:1]
+        if stripped[:1] == b"{" and second in (b'"', b"}"):
+            return "JSON", 0.9
+        if stripped[:1] == b"[" and second in b'{["]-0123456789tfn':
+            return "JSON", 0.85
+        return "JSON", 0.6
+
+    email_confidence = _sniff_email(stripped)
+    if email_confidence:
+        return "Email", email_confidence
+
+    if _looks_like_text(prefix):
+        return "Text", 0.6
+
+    return "Unknown", 0.0
+
+
+def detect_file_type(filename: str, prefix: bytes) -> Tuple[str, float]:
+    """Combine content sniffing with the filename extension.
+
+    Confident content wins; otherwise a known extension is trusted unless the
+    content says otherwise with high confidence.
+    """
+    sniffed, confidence = sniff_content(prefix)
+    extension_type = EXTENSION_TYPES.get(os.path.splitext(filename or "")[1].lower())
+
+    if extension_type is None:
+        return sniffed, confidence
+    if sniffed == extension_type:
+        return sniffed, max(confidence, 0.95)
+    if confidence >= 0.9:
+        return sniffed, confidence
+    return extension_type, 0.5
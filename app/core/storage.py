@@ -0,0 +1,34 @@
+import os
+import tempfile
+
+
+def _file_mode() -> int:
+    """Mode open() gives new files under the process umask (mkstemp always uses 0600)."""
+    # Read once at import: setting the umask to read it is not thread-safe
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+FILE_MODE = _file_mode()
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    """Write data to path so readers in any process see the old file or the new one, never a partial.
+
+    The bytes go to a hidden temp file in the same directory (same filesystem, so
+    the rename is atomic), are flushed to disk, and then replace the target,
+    which gets the permissions a plain open() would have given it.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            os.fchmod(f.fileno(), FILE_MODE)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
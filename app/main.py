@@ -0,0 +1,544 @@
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Query
+from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, FileResponse, RedirectResponse
+from contextlib import asynccontextmanager
+import asyncio
+import os
+from typing import Optional, TYPE_CHECKING
+from sqlalchemy.orm import Session
+from app.core.actions import ActionDispatcher
+from app.core.admission import AdmissionController, AdmissionMiddleware
+from app.core.database import get_db, init_db
+from app.core.artifacts import content_key, text_artifacts
+from app.core.jobs import MAILBOX_INGEST_JOB, REPROCESS_JOB, JobQueue, JobWorker
+from app.core.records import with_preview
+from app.core.rules import rule_store
+from app.core.search import SearchIndex, SearchIndexer
+from app.core.sniffer import SNIFF_BYTES, detect_file_type
+from app.core.storage import atomic_write
+from app.models.models import FileMetadata, Job
+from app.schemas.schemas import MailboxIngestRequest, ReprocessRequest
+
+if TYPE_CHECKING:
+    from app.agents.router import AgentRouter
+
+# Classifier -> PDF/JSON/Email agent pipeline, created once the event loop runs
+agent_router: Optional["AgentRouter"] = None
+
+# Shared by every worker process: jobs live in the database, not in memory
+job_queue = JobQueue()
+job_worker: Optional[JobWorker] = None
+
+# Full-text index of document content, written in batches off the request path
+search_index = SearchIndex()
+search_indexer: Optional[SearchIndexer] = None
+
+# Delivers action_log rows to the CRM/alert sink at ACTION_SINK_URL, if one is set
+action_dispatcher: Optional[ActionDispatcher] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build and warm the agent pipeline before the worker accepts requests."""
+    global agent_router, job_worker, search_indexer, action_dispatcher
+    # The agents (and PyPDF2 in the pool workers) load here, not at import
+    from app.agents.router import AgentRouter
+    from app.agents.mailbox_ingest import ingest_job
+    from app.agents.reprocess import reprocess_job
+
+    init_db()
+    # Compile the rules before the first request and follow edits to the file
+    rule_store.watch()
+    search_index.init()
+    search_indexer = SearchIndexer(search_index)
+    search_indexer.start()
+    agent_router = AgentRouter(indexer=search_indexer)
+    await agent_router.warm_up()
+    job_worker = JobWorker(job_queue, {MAILBOX_INGEST_JOB: ingest_job, REPROCESS_JOB: reprocess_job})
+    job_worker.start()
+    action_dispatcher = ActionDispatcher.from_env()
+    if action_dispatcher is not None:
+        action_dispatcher.start()
+    yield
+    if action_dispatcher is not None:
+        await action_dispatcher.stop()
+    await job_worker.stop()
+    agent_router.shutdown()
+    await search_indexer.stop()
+    rule_store.stop()
+
+app = FastAPI(title="Multi-Agent AI System", lifespan=lifespan)
+
+# Bounded in-flight uploads: 413 over the body limit, 503 + Retry-After when saturated
+admission = AdmissionController.from_env()
+app.add_middleware(AdmissionMiddleware, controller=admission, paths=["/upload"])
+
+# Create uploads directory if it doesn't exist
+os.makedirs("uploads", exist_ok=True)
+
+# Mount the uploads directory
+app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+
+def extract_pdf_content(pdf_bytes: bytes, page: Optional[int] = None) -> str:
+    """Extract text content from PDF bytes, or one 1-based page of it.
+
+    Served from the stored text artifact; the PDF is only parsed if it never was.
+    """
+    try:
+        key = content_key(pdf_bytes)
+        if page is None:
+            return text_artifacts.pdf_text(pdf_bytes, key)
+        # Reads and decompresses just the one page when the artifact exists
+        pages = text_artifacts.get_pages(key, page - 1, page)
+        if pages is None:
+            pages = text_artifacts.pdf_pages(pdf_bytes, key)[page - 1:page]
+        return pages[0] if pages else ""
+    except Exception as e:
+        return f"Error extracting PDF content: {str(e)}"
+
+@app.get("/", response_class=HTMLResponse)
+async def get_upload_form():
+    """Serve the upload form."""
+    return """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Multi-Agent AI System</title>
+        <script src="https://cdn.tailwindcss.com"></script>
+    </head>
+    <body class="bg-gray-100 min-h-screen">
+        <div class="container mx-auto px-4 py-8">
+            <h1 class="text-3xl font-bold text-center mb-8">Multi-Agent AI System</h1>
+            
+            <div class="max-w-2xl mx-auto bg-white rounded-lg shadow-md p-6">
+                <form id="uploadForm" class="space-y-4">
+                    <div class="border-2 border-dashed border-gray-300 rounded-lg p-6 text-center" id="dropZone">
+                        <input type="file" id="fileInput" class="hidden" />
+                        <label for="fileInput" class="cursor-pointer">
+                            <div class="text-gray-600">
+                                <p class="mb-2">Drag and drop your file here or click to select</p>
+                                <p class="text-sm">Supported formats: TXT, PDF, JSON, EML</p>
+                            </div>
+                        </label>
+                    </div>
+                    
+                    <div id="fileInfo" class="hidden">
+                        <p class="text-sm text-gray-600">Selected file: <span id="fileName"></span></p>
+                        <button type="button" onclick="removeFile()" class="text-red-500 text-sm">Remove</button>
+                    </div>
+                    
+                    <button type="submit" class="w-full bg-blue-500 text-white py-2 px-4 rounded-lg hover:bg-blue-600">
+                        Process File
+                    </button>
+                </form>
+                
+                <div id="result" class="hidden mt-6">
+                    <h2 class="text-xl font-semibold mb-2">Processing Result:</h2>
+                    <div id="resultContent" class="bg-gray-100 p-4 rounded-lg overflow-x-auto"></div>
+                    <div id="filePreview" class="mt-4"></div>
+                </div>
+
+                <div class="mt-8">
+                    <h2 class="text-xl font-semibold mb-4">Uploaded Files</h2>
+                    <div id="fileList" class="space-y-2">
+                        <!-- Files will be listed here -->
+                    </div>
+                </div>
+            </div>
+        </div>
+
+        <script>
+            const dropZone = document.getElementById('dropZone');
+            const fileInput = document.getElementById('fileInput');
+            const fileInfo = document.getElementById('fileInfo');
+            const fileName = document.getElementById('fileName');
+            const uploadForm = document.getElementById('uploadForm');
+            const result = document.getElementById('result');
+            const resultContent = document.getElementById('resultContent');
+            const filePreview = document.getElementById('filePreview');
+            const fileList = document.getElementById('fileList');
+
+            // Function to update file list
+            async function updateFileList() {
+                try {
+                    const response = await fetch('/list-files');
+                    const files = await response.json();
+                    fileList.innerHTML = files.map(file => `
+                        <div class="flex items-center justify-between p-2 bg-gray-50 rounded">
+                            <span>${file}</span>
+                            <div class="space-x-2">
+                                <button onclick="viewFile('${file}')" class="text-blue-500 hover:underline">View Content</button>
+                                <a href="/uploads/${file}" target="_blank" class="text-green-500 hover:underline">Download</a>
+                                <button onclick="deleteFile('${file}')" class="text-red-500 hover:underline">Delete</button>
+                            </div>
+                        </div>
+                    `).join('');
+                } catch (error) {
+                    console.error('Error fetching file list:', error);
+                }
+            }
+
+            // Function to view file content
+            async function viewFile(filename) {
+                try {
+                    const response = await fetch(`/view-content/${filename}`);
+                    const data = await response.json();
+                    resultContent.innerHTML = `<pre>${data.content}</pre>`;
+                    result.classList.remove('hidden');
+                } catch (error) {
+                    console.error('Error viewing file:', error);
+                    alert('Error viewing file content');
+                }
+            }
+
+            // Function to delete file
+            async function deleteFile(filename) {
+                if (confirm('Are you sure you want to delete this file?')) {
+                    try {
+                        await fetch(`/delete-file/${filename}`, { method: 'DELETE' });
+                        updateFileList();
+                    } catch (error) {
+                        console.error('Error deleting file:', error);
+                    }
+                }
+            }
+
+            // Handle drag and drop
+            dropZone.addEventListener('dragover', (e) => {
+                e.preventDefault();
+                dropZone.classList.add('border-blue-500');
+            });
+
+            dropZone.addEventListener('dragleave', () => {
+                dropZone.classList.remove('border-blue-500');
+            });
+
+            dropZone.addEventListener('drop', (e) => {
+                e.preventDefault();
+                dropZone.classList.remove('border-blue-500');
+                const file = e.dataTransfer.files[0];
+                fileInput.files = e.dataTransfer.files;
+                fileName.textContent = file.name;
+                fileInfo.classList.remove('hidden');
+            });
+
+            // Handle file selection
+            fileInput.addEventListener('change', () => {
+                if (fileInput.files.length > 0) {
+                    fileName.textContent = fileInput.files[0].name;
+                    fileInfo.classList.remove('hidden');
+                }
+            });
+
+            // Handle form submission
+            uploadForm.addEventListener('submit', async (e) => {
+                e.preventDefault();
+                const file = fileInput.files[0];
+                if (!file) return;
+
+                const formData = new FormData();
+                formData.append('file', file);
+
+                try {
+                    const response = await fetch('/upload', {
+                        method: 'POST',
+                        body: formData
+                    });
+
+                    const data = await response.json();
+                    resultContent.innerHTML = `<pre>${JSON.stringify(data, null, 2)}</pre>`;
+                    result.classList.remove('hidden');
+                    updateFileList();
+                } catch (error) {
+                    console.error('Error:', error);
+                    alert('An error occurred while processing the file.');
+                }
+            });
+
+            function removeFile() {
+                fileInput.value = '';
+                fileInfo.classList.add('hidden');
+                result.classList.add('hidden');
+                filePreview.innerHTML = '';
+            }
+
+            // Initial file list load
+            updateFileList();
+        </script>
+    </body>
+    </html>
+    """
+
+@app.get("/view-content/{filename}")
+async def view_file_content(filename: str, page: Optional[int] = Query(None, ge=1)):
+    """View the content of a file; for PDFs, optionally a single page."""
+    file_path = os.path.join("uploads", filename)
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    file_type = filename.split(".")[-1].lower()
+    
+    try:
+        if file_type == "pdf":
+            with open(file_path, "rb") as f:
+                content = await asyncio.to_thread(extract_pdf_content, f.read(), page)
+        else:
+            with open(file_path, "r", encoding="utf-8") as f:
+                content = f.read()
+        
+        return {"content": content}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/list-files")
+async def list_files():
+    """List all uploaded files."""
+    files = []
+    for filename in os.listdir("uploads"):
+        # Hidden names are uploads still being written by atomic_write
+        if not filename.startswith(".") and os.path.isfile(os.path.join("uploads", filename)):
+            files.append(filename)
+    return files
+
+@app.delete("/delete-file/{filename}")
+async def delete_file(filename: str):
+    """Delete a file."""
+    file_path = os.path.join("uploads", filename)
+    if os.path.exists(file_path):
+        os.remove(file_path)
+        try:
+            await asyncio.to_thread(search_index.remove_filename, filename)
+        except Exception as e:
+            # The file is already gone; a stale index entry is no reason to fail the delete
+            return {"message": "File deleted successfully", "search_index_error": str(e) or type(e).__name__}
+        return {"message": "File deleted successfully"}
+    raise HTTPException(status_code=404, detail="File not found")
+
+@app.post("/upload")
+async def upload_file(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """Upload a file and run it through the agent pipeline."""
+    try:
+        # Sniff the type from the first bytes before reading the rest
+        filename = file.filename
+        prefix = await file.read(SNIFF_BYTES)
+        file_type, confidence = detect_file_type(filename, prefix)
+        agent_router.check_capacity(file_type)
+        content = prefix + await file.read()
+        
+        # Save file; other workers see either the old file or the complete new one
+        file_path = f"uploads/{filename}"
+        # Up to the upload limit written and fsynced, so off the event loop
+        await asyncio.to_thread(atomic_write, file_path, content)
+        
+        # Classifier, then the PDF/JSON/Email agent for the detected type
+        routed = await agent_router.route(filename, content, db)
+        file_type = routed["file_type"].lower()
+        result = routed["result"]
+        file_id = str(routed["file_id"])
+        
+        return {
+            "message": "File processed successfully",
+            "file_id": file_id,
+            "filename": filename,
+            "file_type": file_type,
+            "confidence": confidence,
+            "business_intent": routed["business_intent"],
+            "priority": routed["priority"],
+            "result": result
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/search")
+async def search_documents(
+    q: str = Query(..., min_length=1),
+    file_type: Optional[str] = None,
+    business_intent: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    """Search extracted document content; "quoted text" matches a phrase."""
+    results = await asyncio.to_thread(search_index.search, q, file_type, business_intent, limit, offset)
+    
+    return {
+        "query": q,
+        "results": results,
+        "limit": limit,
+        "offset": offset
+    }
+
+@app.get("/search/stats")
+async def search_stats():
+    """Documents indexed for search, and those still buffered in this worker."""
+    return {"documents": await asyncio.to_thread(search_index.count), **search_indexer.stats()}
+
+@app.get("/rules")
+async def get_rules():
+    """The rules the agents currently apply, and the state of the rules file."""
+    return {**rule_store.stats(), "rules": rule_store.current.as_dict()}
+
+@app.post("/rules/reload")
+async def reload_rules():
+    """Reload the rules file now instead of waiting for the watcher."""
+    try:
+        rules = await asyncio.to_thread(rule_store.reload)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Rules not reloaded: {e}")
+    
+    return {"version": rules.version, "reloads": rule_store.reloads}
+
+@app.get("/agents/stats")
+async def agent_stats():
+    """Concurrency limits and in-flight work per agent lane."""
+    return agent_router.stats()
+
+@app.get("/actions/stats")
+async def action_stats():
+    """Action deliveries made by this worker; disabled when no sink is configured."""
+    if action_dispatcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **action_dispatcher.stats()}
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """Upload slots and body bytes currently held."""
+    return admission.stats()
+
+def get_processed_file(file_id: str, db: Session) -> FileMetadata:
+    """Look up a processed upload by id, whichever worker processed it."""
+    metadata = db.get(FileMetadata, int(file_id)) if file_id.isdigit() else None
+    if metadata is None or metadata.processed_at is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return metadata
+
+@app.get("/status/{file_id}")
+async def get_status(file_id: str, db: Session = Depends(get_db)):
+    """Get processing status for a file."""
+    metadata = get_processed_file(file_id, db)
+    
+    return {
+        "filename": metadata.filename,
+        "file_type": metadata.file_type.lower(),
+        "business_intent": metadata.business_intent,
+        "result": with_preview(metadata.file_type, metadata.result, metadata.preview),
+        "timestamp": metadata.processed_at.isoformat()
+    }
+
+@app.get("/status/{file_id}/history")
+async def get_status_history(file_id: str, db: Session = Depends(get_db)):
+    """Every stored agent result for a file: the upload-time one, then each reprocess version."""
+    from app.agents.reprocess import versioned_results
+    
+    metadata = get_processed_file(file_id, db)
+    
+    return {
+        "file_id": metadata.id,
+        "file_type": metadata.file_type.lower(),
+        "results": versioned_results(db, metadata.id, metadata.file_type)
+    }
+
+@app.get("/download/{file_id}")
+async def download_file(file_id: str, db: Session = Depends(get_db)):
+    """Download a processed file."""
+    metadata = get_processed_file(file_id, db)
+    file_path = f"uploads/{metadata.filename}"
+    
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="File not found on server")
+    
+    return FileResponse(
+        file_path,
+        media_type="application/octet-stream",
+        filename=metadata.filename
+    )
+
+@app.get("/view/{file_id}")
+async def view_file(file_id: str, db: Session = Depends(get_db)):
+    """View a file in the browser."""
+    metadata = get_processed_file(file_id, db)
+    file_path = f"uploads/{metadata.filename}"
+    
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="File not found on server")
+    
+    return FileResponse(
+        file_path,
+        media_type="application/pdf" if metadata.file_type == "PDF" else "text/plain",
+        filename=metadata.filename
+    )
+
+@app.post("/ingest/mailbox", status_code=202)
+async def ingest_mailbox(request: MailboxIngestRequest, db: Session = Depends(get_db)):
+    """Queue a bulk ingest of a server-side mbox file or Maildir directory."""
+    from app.agents.mailbox_ingest import MailboxIngestor, resolve_mailbox
+    
+    path = resolve_mailbox(request.path)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Mailbox not found")
+    
+    # One unfinished job per mailbox, however many workers receive the request
+    job = await asyncio.to_thread(job_queue.enqueue, db, MAILBOX_INGEST_JOB, {**request.model_dump(), "path": path}, dedup_key=path)
+    
+    return {
+        "message": "Mailbox ingest queued",
+        "job_id": job.id,
+        "status": job.status,
+        "path": path,
+        "checkpoint": MailboxIngestor().checkpoint_path(path)
+    }
+
+@app.get("/ingest/mailbox/status")
+async def ingest_mailbox_status(path: str):
+    """Get the progress of a mailbox ingest from its checkpoint."""
+    from app.agents.mailbox_ingest import MailboxIngestor, resolve_mailbox
+    
+    state = MailboxIngestor().load_checkpoint(resolve_mailbox(path))
+    if state is None:
+        raise HTTPException(status_code=404, detail="No ingest found for this mailbox")
+    
+    return state
+
+@app.post("/reprocess", status_code=202)
+async def reprocess(request: ReprocessRequest, db: Session = Depends(get_db)):
+    """Queue a re-run of the agents over all stored documents as a new result version."""
+    # One reprocess at a time; a repeat request returns the job already queued
+    job = await asyncio.to_thread(job_queue.enqueue, db, REPROCESS_JOB, request.model_dump(), dedup_key=REPROCESS_JOB)
+    
+    return {
+        "message": "Reprocessing queued",
+        "job_id": job.id,
+        "version": job.id,
+        "status": job.status
+    }
+
+@app.get("/jobs/worker/stats")
+async def job_worker_stats():
+    """Background jobs run by this worker process."""
+    return job_worker.stats()
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: int, db: Session = Depends(get_db)):
+    """Get the state of a queued background job."""
+    job = db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "worker_id": job.worker_id,
+        "attempts": job.attempts,
+        "progress": job.progress,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at
+    }
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, JSON, Index
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -11,16 +12,23 @@ class FileMetadata(Base):
     business_intent = Column(String)  # RFQ, Complaint, Invoice, Regulation, Fraud Risk
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     processed_at = Column(DateTime(timezone=True), nullable=True)
+    result = Column(JSON, nullable=True)  # Agent output served by /status
+    preview = deferred(Column(String, nullable=True))  # Truncated content preview, only loaded by /status
+    content_hash = Column(String, index=True, nullable=True)  # SHA-256, keys the text artifact
+    source_path = Column(String, nullable=True)  # mailbox a bulk-ingested email was read from
+    rules_version = Column(Integer, nullable=True)  # rules file version the classifier applied
 
 class EmailProcessing(Base):
     __tablename__ = "email_processing"
 
     id = Column(Integer, primary_key=True, index=True)
     file_id = Column(Integer, index=True)
-    sender_email = Column(String)
+    sender_email = Column(String, index=True)
     tone = Column(String)  # angry, polite, threatening
     urgency = Column(String)  # low, medium, high
     is_escalated = Column(Boolean, default=False)
+    rules_version = Column(Integer, nullable=True)
+    version = Column(Integer, nullable=True, index=True)  # reprocess job id; NULL for the upload-time result
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class JsonProcessing(Base):
@@ -30,6 +38,7 @@ class JsonProcessing(Base):
     file_id = Column(Integer, index=True)
     schema_valid = Column(Boolean)
     anomalies = Column(JSON)  # List of anomalies found
+    version = Column(Integer, nullable=True, index=True)  # reprocess job id; NULL for the upload-time result
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class PdfProcessing(Base):
@@ -41,6 +50,9 @@ class PdfProcessing(Base):
     is_high_value = Column(Boolean, default=False)
     has_gdpr = Column(Boolean, default=False)
     has_fda = Column(Boolean, default=False)
+    rules_version = Column(Integer, nullable=True)
+    line_items = Column(JSON, nullable=True)  # invoice table rows, see app.core.line_items
+    version = Column(Integer, nullable=True, index=True)  # reprocess job id; NULL for the upload-time result
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class ActionLog(Base):
@@ -49,7 +61,39 @@ class ActionLog(Base):
     id = Column(Integer, primary_key=True, index=True)
     file_id = Column(Integer, index=True)
     action_type = Column(String)  # crm_escalation, risk_alert
-    status = Column(String)  # success, failed
+    status = Column(String)  # pending, sending, success, failed
     retry_count = Column(Integer, default=0)
+    dedup_key = Column(String, nullable=True)  # sender:window for coalesced escalations
+    event_count = Column(Integer, default=1)  # events coalesced into this action
+    last_event_at = Column(DateTime(timezone=True), nullable=True)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)  # retry backoff, or lease while sending
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    completed_at = Column(DateTime(timezone=True), nullable=True) 
\ No newline at end of file
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("uq_action_log_dedup", "action_type", "dedup_key", unique=True),
+        Index("ix_action_log_delivery", "status", "id"),
+    ) 
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String)  # mailbox_ingest
+    payload = Column(JSON)
+    status = Column(String, default="pending")  # pending, running, done, failed
+    dedup_key = Column(String, nullable=True)  # set while pending/running, cleared when finished
+    worker_id = Column(String, nullable=True)  # host:pid holding the claim
+    attempts = Column(Integer, default=0)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    progress = Column(JSON, nullable=True)  # latest report from the running handler
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_claim", "status", "kind", "id"),
+        Index("uq_jobs_active", "kind", "dedup_key", unique=True),
+    )
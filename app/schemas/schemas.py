@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 
 class FileMetadataBase(BaseModel):
@@ -14,6 +14,7 @@ class FileMetadata(FileMetadataBase):
     id: int
     created_at: datetime
     processed_at: Optional[datetime] = None
+    rules_version: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -34,11 +35,24 @@ class EmailProcessingCreate(EmailProcessingBase):
 class EmailProcessing(EmailProcessingBase):
     id: int
     file_id: int
+    rules_version: Optional[int] = None
     created_at: datetime
 
     class Config:
         from_attributes = True
 
+class MailboxIngestRequest(BaseModel):
+    path: str
+    format: str = Field("auto", pattern="^(auto|mbox|maildir)$")
+    workers: Optional[int] = Field(None, ge=1)
+    batch_size: int = Field(500, ge=1)
+    resume: bool = True
+
+class ReprocessRequest(BaseModel):
+    agents: List[Literal["pdf", "email", "json"]] = Field(["pdf", "email", "json"], min_length=1)
+    workers: Optional[int] = Field(None, ge=1)
+    chunk_size: int = Field(500, ge=1)
+
 class JsonWebhook(BaseModel):
     data: Dict[str, Any]
 
@@ -57,6 +71,13 @@ class JsonProcessing(JsonProcessingBase):
     class Config:
         from_attributes = True
 
+class InvoiceLineItem(BaseModel):
+    page: int
+    description: str
+    quantity: Optional[float] = None
+    unit_price: Optional[float] = None
+    amount: float
+
 class PdfProcessingBase(BaseModel):
     total_amount: Optional[float] = None
     is_high_value: bool = False
@@ -69,6 +90,8 @@ class PdfProcessingCreate(PdfProcessingBase):
 class PdfProcessing(PdfProcessingBase):
     id: int
     file_id: int
+    rules_version: Optional[int] = None
+    line_items: Optional[List[InvoiceLineItem]] = None
     created_at: datetime
 
     class Config:
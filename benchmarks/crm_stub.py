@@ -0,0 +1,140 @@
+"""Local stand-in for the CRM/alert sink that action_log deliveries go to.
+
+Usage: python -m benchmarks.crm_stub [--port 9000] [--latency-ms 20] [--error-rate 0.05]
+
+Point the app at it with ACTION_SINK_URL=http://127.0.0.1:9000/actions.
+
+  POST /actions - accepts an action; answers 500 for a --error-rate share of
+                  requests, after --latency-ms (plus up to --jitter-ms)
+  GET  /stats   - actions received, duplicates by Idempotency-Key, errors returned
+  POST /reset   - clear the counters
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+
+class CrmStub:
+    """Counters and fault injection shared by the request handler threads."""
+
+    def __init__(self, latency_ms: float = 20.0, jitter_ms: float = 10.0, error_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.received = 0
+            self.errors = 0
+            self.duplicates = 0
+            self.by_type: Dict[str, int] = {}
+            self._keys = set()
+
+    def handle(self, action: Dict[str, Any], idempotency_key: Optional[str]) -> int:
+        with self._lock:
+            delay = (self.latency_ms + self._rng.uniform(0, self.jitter_ms)) / 1000
+            fail = self._rng.random() < self.error_rate
+        time.sleep(delay)
+        with self._lock:
+            if fail:
+                self.errors += 1
+                return 500
+            self.received += 1
+            action_type = str(action.get("action_type"))
+            self.by_type[action_type] = self.by_type.get(action_type, 0) + 1
+            if idempotency_key is not None:
+                if idempotency_key in self._keys:
+                    self.duplicates += 1
+                self._keys.add(idempotency_key)
+        return 202
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "received": self.received,
+                "by_type": dict(self.by_type),
+                "duplicates": self.duplicates,
+                "errors_returned": self.errors
+            }
+
+
+def make_handler(stub: CrmStub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, status: int, body: Dict[str, Any]) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length)
+            if self.path == "/reset":
+                stub.reset()
+                self._reply(200, {"reset": True})
+            elif self.path == "/actions":
+                try:
+                    action = json.loads(body or b"{}")
+                except ValueError:
+                    self._reply(400, {"detail": "Invalid JSON"})
+                    return
+                status = stub.handle(action, self.headers.get("Idempotency-Key"))
+                self._reply(status, {"accepted": status < 300})
+            else:
+                self._reply(404, {"detail": "Not found"})
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._reply(200, stub.stats())
+            else:
+                self._reply(404, {"detail": "Not found"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(stub: CrmStub, host: str = "127.0.0.1", port: int = 9000) -> Tuple[ThreadingHTTPServer, threading.Thread]:
+    """Run the stub on a daemon thread; call server.shutdown() to stop it."""
+    server = ThreadingHTTPServer((host, port), make_handler(stub))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="crm-stub", daemon=True)
+    thread.start()
+    return server, thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local CRM/alert sink for action_log deliveries.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 500")
+    args = parser.parse_args()
+
+    stub = CrmStub(args.latency_ms, args.jitter_ms, args.error_rate)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(stub))
+    server.daemon_threads = True
+    print(f"CRM stub listening on http://{args.host}:{args.port}/actions")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(stub.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Time invoice line item extraction on a generated multi-page invoice.
+
+Usage: python -m benchmarks.line_items [n_lines] [workers (default: one per core)]
+
+Builds an invoice of n_lines items (default 500, 45 per page) with every cell
+drawn at its own position, as accounting exports draw them, then reports:
+  text      - PyPDF2 extract_text on every page, for reference
+  serial    - extract_line_items over the whole document in one process
+  parallel  - page ranges on a process pool, split as AgentRouter splits them
+and checks the extracted items against the generated ones.
+"""
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+from app.agents.router import LINE_ITEM_PAGES_PER_TASK, LINE_ITEM_TASKS_PER_DOCUMENT
+from app.core.extraction import extract_pdf_pages, warm_up_worker
+from app.core.line_items import extract_line_items
+from benchmarks.loadtest import pdf_from_streams, pdf_string
+
+Item = Tuple[str, float, float, float]
+
+
+def make_invoice(n_lines: int, per_page: int = 45, seed: int = 42) -> Tuple[bytes, List[Item]]:
+    rng = random.Random(seed)
+    items = []
+    for i in range(n_lines):
+        quantity, unit_price = rng.randint(1, 20), round(rng.uniform(1, 500), 2)
+        items.append((f"Widget model {i} ({rng.choice(['blue', 'red', 'steel'])})", quantity, unit_price, round(quantity * unit_price, 2)))
+
+    streams = []
+    for first in range(0, n_lines, per_page):
+        ops, y = ["BT /F1 9 Tf"], 800
+
+        def cell(x: int, text: str) -> None:
+            ops.append(f"1 0 0 1 {x} {y} Tm ({pdf_string(text)}) Tj")
+
+        if first == 0:
+            cell(40, "INVOICE INV-0001")
+            y -= 14
+            cell(40, "Bill to: ACME Corp, 1 Main St")
+            y -= 24
+        for x, header in ((40, "Description"), (300, "Qty"), (360, "Unit Price"), (460, "Amount")):
+            cell(x, header)
+        for description, quantity, unit_price, amount in items[first:first + per_page]:
+            y -= 14
+            cell(40, description)
+            cell(300, str(quantity))
+            cell(360, f"${unit_price:,.2f}")
+            cell(460, f"${amount:,.2f}")
+        if first + per_page >= n_lines:
+            y -= 24
+            cell(360, "Total")
+            cell(460, f"${sum(item[3] for item in items):,.2f}")
+        ops.append("ET")
+        streams.append("\n".join(ops).encode("latin-1"))
+    return pdf_from_streams(streams), items
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main():
+    n_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    content, expected = make_invoice(n_lines)
+
+    pages, text_ms = timed(extract_pdf_pages, content)
+    serial, serial_ms = timed(extract_line_items, content)
+
+    # As many ranges as AgentRouter would run with every other worker idle
+    tasks = min(workers, LINE_ITEM_TASKS_PER_DOCUMENT, math.ceil(len(pages) / LINE_ITEM_PAGES_PER_TASK))
+    per_task = math.ceil(len(pages) / tasks)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Fork the workers and import PyPDF2 in them before timing
+        for future in [pool.submit(warm_up_worker) for _ in range(workers)]:
+            future.result()
+        started = time.perf_counter()
+        futures = [pool.submit(extract_line_items, content, start, start + per_task) for start in range(0, len(pages), per_task)]
+        parallel = [item for future in futures for item in future.result()]
+        parallel_ms = (time.perf_counter() - started) * 1000
+
+    correct = sum(
+        (item.description, item.quantity, item.unit_price, item.amount) == want
+        for item, want in zip(serial, expected)
+    )
+    print(f"{n_lines} line items on {len(pages)} pages")
+    print(f"  text      {text_ms:8.1f} ms")
+    print(f"  serial    {serial_ms:8.1f} ms")
+    print(f"  parallel  {parallel_ms:8.1f} ms ({len(futures)} tasks on {workers} workers)")
+    print(f"  extracted {len(serial)} items, {correct} exactly right, parallel run {'matches' if parallel == serial else 'DIFFERS'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""Replay a mix of PDF, JSON and email uploads against a running app at a target rate.
+
+Usage: python -m benchmarks.loadtest --url http://127.0.0.1:8000 --rate 20 --duration 60
+           [--mix pdf=2,json=3,email=4,search=1] [--status-ratio 0.5]
+           [--crm-stub 9000] [--report report.json]
+
+Requests are open-loop: they start on a fixed schedule whatever the response
+times, and latency is measured from each request's scheduled start, so an
+overloaded server shows up as latency instead of as a lower request rate.
+Every upload is unique (nothing is served from the artifact store), a share of
+emails are angry and urgent and a share of invoices are high value, so CRM
+escalations and risk alerts are raised at a realistic rate.
+
+With --crm-stub PORT a CrmStub (benchmarks/crm_stub.py) runs in this process;
+start the app with ACTION_SINK_URL=http://127.0.0.1:PORT/actions so its action
+deliveries are part of the test. The report gives throughput, error rate and
+p50/p95/p99 latency per endpoint, and what the stub received.
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from benchmarks.crm_stub import CrmStub, serve
+
+SEARCH_TERMS = ["invoice", "refund", "urgent", "contract", "\"charged twice\"", "report*", "payment"]
+
+
+def make_pdf(lines: List[str], pages: int) -> bytes:
+    """A minimal PDF with the given text lines on every page (Helvetica, no compression)."""
+    stream = f"BT /F1 9 Tf 20 800 Td ({pdf_string(' '.join(lines))}) Tj ET".encode("latin-1", errors="replace")
+    return pdf_from_streams([stream] * pages)
+
+
+def pdf_string(text: str) -> str:
+    """Escape text for use inside a PDF literal string."""
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def pdf_from_streams(streams: List[bytes]) -> bytes:
+    """A minimal PDF with one page per content stream, font /F1 being Helvetica."""
+    pages = len(streams)
+    font = 3 + 2 * pages
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % (3 + 2 * p) for p in range(pages)), pages)
+    ]
+    for p in range(pages):
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (4 + 2 * p, font)
+        )
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(streams[p]), streams[p]))
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+class PayloadFactory:
+    """Unique, realistic documents of each type."""
+
+    def __init__(self, seed: int, pdf_pages: Tuple[int, int]):
+        self.rng = random.Random(seed)
+        self.pdf_pages = pdf_pages
+        self.counter = 0
+        self._lock = threading.Lock()
+
+    def _next(self) -> Tuple[int, random.Random]:
+        with self._lock:
+            self.counter += 1
+            return self.counter, random.Random(self.rng.random())
+
+    def pdf(self) -> Tuple[str, bytes, str]:
+        n, rng = self._next()
+        # One in five invoices is over the high-value threshold
+        total = rng.uniform(10_001, 90_000) if rng.random() < 0.2 else rng.uniform(50, 9_000)
+        lines = [f"Invoice INV-{n:08d}", "Payment terms: 30 days", f"Total: ${total:,.2f}"]
+        if rng.random() < 0.1:
+            lines.append("Processed under the General Data Protection Regulation (GDPR).")
+        return f"invoice-{n}.pdf", make_pdf(lines, rng.randint(*self.pdf_pages)), "application/pdf"
+
+    def json(self) -> Tuple[str, bytes, str]:
+        n, rng = self._next()
+        event = {
+            "event_type": rng.choice(["user.login", "order.created", "payment.failed"]),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "data": {"user_id": f"user-{rng.randrange(10_000)}", "action": "webhook", "metadata": {"n": n}}
+        }
+        if rng.random() < 0.1:
+            # Schema anomalies
+            del event["data"]["user_id"]
+        return f"webhook-{n}.json", json.dumps(event).encode(), "application/json"
+
+    def email(self) -> Tuple[str, bytes, str]:
+        n, rng = self._next()
+        if rng.random() < 0.15:
+            subject, body = "URGENT: charged twice", "I am furious, this is unacceptable. Refund me immediately."
+        else:
+            subject, body = "Question about my order", "Hello, could you please send the invoice? Thank you, regards."
+        message = (
+            f"From: customer{rng.randrange(2_000)}@example.com\n"
+            f"To: support@example.com\nSubject: {subject}\n"
+            f"Date: {datetime.now(timezone.utc):%a, %d %b %Y %H:%M:%S +0000}\n\n"
+            f"{body}\nOrder reference: {n}\n"
+        )
+        return f"message-{n}.eml", message.encode(), "message/rfc822"
+
+
+class Recorder:
+    """Latencies and outcomes per endpoint, from many threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[Tuple[float, Optional[int]]]] = {}
+
+    def add(self, endpoint: str, latency: float, status: Optional[int]) -> None:
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append((latency, status))
+
+    @staticmethod
+    def _percentile(values: List[float], q: float) -> float:
+        # Nearest rank on sorted values
+        return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+    def report(self, elapsed: float) -> Dict[str, Dict[str, Any]]:
+        report = {}
+        with self._lock:
+            for endpoint, samples in sorted(self.samples.items()):
+                latencies = sorted(latency for latency, _ in samples)
+                statuses: Dict[str, int] = {}
+                for _, status in samples:
+                    key = str(status) if status is not None else "error"
+                    statuses[key] = statuses.get(key, 0) + 1
+                errors = sum(1 for _, status in samples if status is None or status >= 400)
+                report[endpoint] = {
+                    "requests": len(samples),
+                    "throughput_rps": round(len(samples) / elapsed, 2),
+                    "error_rate": round(errors / len(samples), 4),
+                    "p50_ms": round(self._percentile(latencies, 50) * 1000, 1),
+                    "p95_ms": round(self._percentile(latencies, 95) * 1000, 1),
+                    "p99_ms": round(self._percentile(latencies, 99) * 1000, 1),
+                    "max_ms": round(latencies[-1] * 1000, 1),
+                    "statuses": statuses
+                }
+        return report
+
+
+class LoadTest:
+    def __init__(
+        self,
+        url: str,
+        rate: float,
+        duration: float,
+        mix: Dict[str, float],
+        status_ratio: float = 0.5,
+        concurrency: int = 64,
+        timeout: float = 60.0,
+        pdf_pages: Tuple[int, int] = (1, 20),
+        seed: int = 42
+    ):
+        self.url = url.rstrip("/")
+        self.rate = rate
+        self.duration = duration
+        self.mix = mix
+        self.status_ratio = status_ratio
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.payloads = PayloadFactory(seed, pdf_pages)
+        self.recorder = Recorder()
+        self.rng = random.Random(seed)
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _request(self, endpoint: str, started: float, method: str, path: str, **kwargs: Any) -> Optional[requests.Response]:
+        try:
+            response = self._session().request(method, self.url + path, timeout=self.timeout, **kwargs)
+        except requests.RequestException:
+            self.recorder.add(endpoint, time.perf_counter() - started, None)
+            return None
+        self.recorder.add(endpoint, time.perf_counter() - started, response.status_code)
+        return response
+
+    def _run_one(self, kind: str, scheduled: float, follow_up: bool, term: str) -> None:
+        if kind == "search":
+            self._request("GET /search", scheduled, "GET", "/search", params={"q": term})
+            return
+
+        filename, content, content_type = getattr(self.payloads, kind)()
+        response = self._request(
+            f"POST /upload ({kind})", scheduled, "POST", "/upload", files={"file": (filename, content, content_type)}
+        )
+        if follow_up and response is not None and response.status_code == 200:
+            # Closed loop: a client polling for the result it just got an id for
+            file_id = response.json()["file_id"]
+            self._request("GET /status/{file_id}", time.perf_counter(), "GET", f"/status/{file_id}")
+
+    def run(self) -> Dict[str, Any]:
+        kinds, weights = zip(*self.mix.items())
+        total = int(self.rate * self.duration)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for i in range(total):
+                scheduled = started + i / self.rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                kind = self.rng.choices(kinds, weights)[0]
+                pool.submit(
+                    self._run_one, kind, scheduled, self.rng.random() < self.status_ratio, self.rng.choice(SEARCH_TERMS)
+                )
+        elapsed = time.perf_counter() - started
+        return {
+            "target_rps": self.rate,
+            "duration_s": round(elapsed, 1),
+            "endpoints": self.recorder.report(elapsed)
+        }
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for item in value.split(","):
+        kind, _, weight = item.partition("=")
+        if kind not in ("pdf", "json", "email", "search"):
+            raise argparse.ArgumentTypeError(f"Unknown request kind: {kind}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"target {report['target_rps']} req/s for {report['duration_s']}s")
+    print(f"{'endpoint':26} {'requests':>8} {'req/s':>7} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for endpoint, stats in report["endpoints"].items():
+        print(
+            f"{endpoint:26} {stats['requests']:8} {stats['throughput_rps']:7.1f} {stats['error_rate']:7.1%} "
+            f"{stats['p50_ms']:8.1f} {stats['p95_ms']:8.1f} {stats['p99_ms']:8.1f} {stats['max_ms']:8.1f}"
+        )
+        if set(stats["statuses"]) - {"200"}:
+            print(f"{'':26} statuses: {stats['statuses']}")
+    if "crm" in report:
+        print(f"CRM stub: {json.dumps(report['crm'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load test of the upload pipeline.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rate", type=float, default=10.0, help="requests started per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("pdf=2,json=3,email=4,search=1"))
+    parser.add_argument("--status-ratio", type=float, default=0.5, help="share of uploads followed by GET /status")
+    parser.add_argument("--concurrency", type=int, default=64, help="most requests in flight")
+    parser.add_argument("--pdf-pages", default="1-20", help="page count range of generated PDFs")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--crm-stub", type=int, metavar="PORT", help="run a CRM stub on this port")
+    parser.add_argument("--crm-latency-ms", type=float, default=20.0)
+    parser.add_argument("--crm-error-rate", type=float, default=0.0)
+    parser.add_argument("--drain", type=float, default=5.0, help="seconds to wait for action deliveries at the end")
+    parser.add_argument("--report", help="also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    low, _, high = args.pdf_pages.partition("-")
+    crm = None
+    if args.crm_stub:
+        crm = CrmStub(args.crm_latency_ms, error_rate=args.crm_error_rate, seed=args.seed)
+        serve(crm, port=args.crm_stub)
+
+    test = LoadTest(
+        args.url, args.rate, args.duration, args.mix,
+        status_ratio=args.status_ratio,
+        concurrency=args.concurrency,
+        pdf_pages=(int(low), int(high or low)),
+        seed=args.seed
+    )
+    report = test.run()
+    if crm is not None:
+        time.sleep(args.drain)
+        report["crm"] = crm.stats()
+
+    print_report(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Measure the memory held per in-flight result record.
+
+Usage: python -m benchmarks.result_memory [n_records]
+
+Compares the dicts bulk ingest used to pass from its workers to the parent with
+the IngestedEmail records it passes now, and a claimed job as a dict with a
+ClaimedJob. Reports, per record:
+  resident - bytes allocated once a pickled batch is loaded in the parent
+  pickled  - bytes sent back from the worker process
+"""
+import pickle
+import random
+import sys
+import tracemalloc
+from typing import Any, Callable, List, Tuple
+
+from app.agents.mailbox_ingest import _analyze_batch
+from app.core.jobs import ClaimedJob
+from app.core.search import MAX_INDEXED_CHARS
+
+
+def make_messages(n: int, seed: int = 42) -> List[Tuple[str, bytes]]:
+    rng = random.Random(seed)
+    words = ["invoice", "please", "urgent", "order", "refund", "thank", "meeting", "report", "regards"]
+    words += ["".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(3, 9))) for _ in range(3000)]
+    return [
+        (
+            str(i * 4096),
+            (
+                f"From: user{rng.randrange(n // 20 + 1)}@example.com\n"
+                f"Subject: order {i}\nDate: Mon, 1 Jan 2024 10:00:00 +0000\n\n"
+                + " ".join(rng.choices(words, k=rng.randint(50, 400)))
+                + "\n\nRegards\n"
+            ).encode()
+        )
+        for i in range(n)
+    ]
+
+
+def as_dicts(messages: List[Tuple[str, bytes]]) -> List[dict]:
+    """The per-message dicts ingest produced before IngestedEmail."""
+    records = []
+    for record, (key, raw) in zip(_analyze_batch(messages), messages):
+        content = raw.decode("utf-8", errors="replace")
+        result = {
+            "sender_email": record.sender_email,
+            "request": content.strip(),
+            "tone": record.tone,
+            "urgency": record.urgency,
+            "is_escalated": record.is_escalated,
+            "rules_version": record.rules_version
+        }
+        result["business_intent"] = record.business_intent
+        result["received_at"] = record.received_at.isoformat() if record.received_at else None
+        result["text"] = content[:MAX_INDEXED_CHARS]
+        result["key"] = key
+        records.append(result)
+    return records
+
+
+def measure(build: Callable[[], List[Any]]) -> Tuple[float, float]:
+    payload = pickle.dumps(build())
+    tracemalloc.start()
+    records = pickle.loads(payload)
+    resident = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return resident / len(records), len(payload) / len(records)
+
+
+def report(name: str, before: Tuple[float, float], after: Tuple[float, float]) -> None:
+    print(name)
+    for label, old, new in zip(("resident", "pickled"), before, after):
+        print(f"  {label:9} {old:8,.0f} -> {new:8,.0f} bytes/record ({old / new:.1f}x)")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    messages = make_messages(n)
+
+    report(f"{n} ingested emails", measure(lambda: as_dicts(messages)), measure(lambda: _analyze_batch(messages)))
+
+    jobs = [(i, "mailbox_ingest", {"path": f"/data/mail/box{i}.mbox"}, 1) for i in range(n)]
+    report(
+        f"{n} claimed jobs",
+        measure(lambda: [{"id": i, "kind": k, "payload": p, "attempt": a} for i, k, p, a in jobs]),
+        measure(lambda: [ClaimedJob(*job) for job in jobs])
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Measure how long a fresh worker takes to become ready.
+
+Usage: python -m benchmarks.startup [runs]
+
+Reports, as the median over several fresh processes:
+  import   - `import app.main` alone
+  lifespan - import plus the lifespan hook (DB init, agent warm-up, PDF pool fork)
+  serving  - spawning uvicorn until GET /agents/stats answers 200
+"""
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+import app.main
+print(time.perf_counter() - start)
+"""
+
+LIFESPAN_SCRIPT = """
+import asyncio, time
+start = time.perf_counter()
+import app.main
+
+async def main():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        print(time.perf_counter() - start)
+
+asyncio.run(main())
+"""
+
+
+def _timed_script(script: str) -> float:
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _time_to_serving(timeout: float = 30.0) -> float:
+    port = _free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/agents/stats", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError("server did not become ready")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    results = {
+        "import": [_timed_script(IMPORT_SCRIPT) for _ in range(runs)],
+        "lifespan": [_timed_script(LIFESPAN_SCRIPT) for _ in range(runs)],
+        "serving": [_time_to_serving() for _ in range(runs)]
+    }
+    for name, samples in results.items():
+        print(f"{name:9s} median {statistics.median(samples) * 1000:7.1f} ms   max {max(samples) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
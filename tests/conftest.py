@@ -0,0 +1,31 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Settings are read at import, so point every store at a scratch directory first;
+# relative defaults (uploads, artifacts, mailboxes, ingest_state) land there too
+WORKDIR = tempfile.mkdtemp(prefix="multi-agent-tests-")
+os.chdir(WORKDIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'test.db')}"
+os.environ["SEARCH_INDEX_PATH"] = os.path.join(WORKDIR, "search_index.db")
+os.environ["MAILBOX_ROOT"] = os.path.join(WORKDIR, "mailboxes")
+os.makedirs(os.environ["MAILBOX_ROOT"], exist_ok=True)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def mailbox_root() -> str:
+    return os.environ["MAILBOX_ROOT"]
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from app.core.database import SessionLocal, init_db
+from app.core.jobs import JobQueue, JobWorker
+from app.models.models import Job
+
+
+@pytest.mark.parametrize("exception", [RuntimeError(), ValueError("")])
+def test_exception_without_message_fails_the_job(exception):
+    def handler(payload, context):
+        raise exception
+
+    init_db()
+    queue = JobQueue()
+    kind = f"broken-{type(exception).__name__}"
+    db = SessionLocal()
+    try:
+        job_id = queue.enqueue(db, kind, {}).id
+    finally:
+        db.close()
+
+    worker = JobWorker(queue, {kind: handler})
+    job = worker._claim()
+    assert job is not None and job.id == job_id
+    asyncio.run(worker._execute(job))
+
+    db = SessionLocal()
+    try:
+        stored = db.get(Job, job_id)
+        assert stored.status == "failed"
+        assert stored.error == type(exception).__name__
+    finally:
+        db.close()
+    assert worker.failed == 1
@@ -0,0 +1,35 @@
+import os
+
+from app.agents.mailbox_ingest import MailboxIngestor
+from app.core.search import SearchIndex
+
+
+def write_mbox(path: str, count: int) -> None:
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(
+                f"From sender{i}@example.com Mon Jan  1 00:00:00 2024\n"
+                f"From: sender{i}@example.com\nSubject: order {i}\n\n"
+                f"Please send the invoice for order {i}.\n\n"
+            )
+
+
+def test_ingested_messages_have_a_status(client, mailbox_root):
+    path = os.path.join(mailbox_root, "status.mbox")
+    write_mbox(path, 3)
+
+    state = MailboxIngestor(workers=1).ingest(path, resume=False)
+    assert state["processed"] == 3
+
+    hits = SearchIndex().search("order", limit=10)
+    file_ids = [hit["file_id"] for hit in hits if hit["filename"].startswith("status.mbox#")]
+    assert len(file_ids) == 3
+    for file_id in file_ids:
+        response = client.get(f"/status/{file_id}")
+        assert response.status_code == 200
+        status = response.json()
+        assert status["file_type"] == "email"
+        assert status["result"]["source_path"] == os.path.realpath(path)
+        assert status["result"]["rules_version"] is not None
+        assert status["result"]["business_intent"] == status["business_intent"]
+        assert client.get(f"/status/{file_id}/history").status_code == 200
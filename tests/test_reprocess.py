@@ -0,0 +1,18 @@
+import json
+
+from app.agents.reprocess import Reprocessor
+
+
+def test_reprocess_upload_with_hash_in_name(client):
+    content = json.dumps({"order_id": "12", "amount": 40.0}).encode()
+    response = client.post("/upload", files={"file": ("order#12.json", content, "application/json")})
+    assert response.status_code == 200
+    file_id = int(response.json()["file_id"])
+
+    progress = Reprocessor(agents=["json"], workers=1).run(9001)
+    assert progress["finished"]
+    assert progress["missing"] == 0
+    assert progress["from_search_index"] == 0
+
+    history = client.get(f"/status/{file_id}/history").json()["results"]
+    assert [result["version"] for result in history] == [None, 9001]
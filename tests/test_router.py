@@ -0,0 +1,24 @@
+import pytest
+from fastapi import HTTPException
+
+from app.agents.router import AgentRouter
+
+
+def test_lane_limits_from_env(monkeypatch):
+    monkeypatch.setenv("PDF_WORKERS", "1")
+    monkeypatch.setenv("JSON_CONCURRENCY", "2")
+    monkeypatch.setenv("LANE_MAX_QUEUE", "0")
+    monkeypatch.setenv("LANE_RETRY_AFTER", "7")
+    router = AgentRouter()
+    try:
+        lane = router.lanes["JSON"]
+        assert (lane.max_concurrency, lane.max_queue, lane.retry_after) == (2, 0, 7)
+        assert router.lanes["PDF"].max_concurrency == 1
+
+        lane.scheduler.active = 2
+        with pytest.raises(HTTPException) as rejected:
+            router.check_capacity("JSON")
+        assert rejected.value.status_code == 429
+        assert rejected.value.headers["Retry-After"] == "7"
+    finally:
+        router.shutdown()
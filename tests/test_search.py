@@ -0,0 +1,51 @@
+import os
+
+from sqlalchemy import text
+
+from app.core.search import SearchIndex
+
+
+def document(file_id: int, filename: str) -> dict:
+    return {"file_id": file_id, "filename": filename, "file_type": "Text", "business_intent": "", "body": f"body {file_id}"}
+
+
+def test_count_follows_writes(tmp_path):
+    index = SearchIndex(str(tmp_path / "index.db"))
+    assert index.count() == 0
+    index.add_many([document(1, "a.txt"), document(2, "b.txt"), document(3, "b.txt")])
+    # Re-indexing a document replaces it
+    index.add_many([document(1, "a.txt"), document(4, "c.txt")])
+    assert index.count() == 4
+    index.remove_filename("b.txt")
+    assert index.count() == 2
+
+
+def test_count_seeded_for_an_existing_index(tmp_path):
+    path = str(tmp_path / "index.db")
+    index = SearchIndex(path)
+    index.add_many([document(1, "a.txt"), document(2, "b.txt")])
+    with index.engine.begin() as conn:
+        conn.execute(text("DROP TABLE document_count"))
+    assert SearchIndex(path).count() == 2
+
+
+def test_delete_survives_index_errors(client, monkeypatch):
+    from app import main
+
+    client.post("/upload", files={"file": ("gone.txt", b"plain text to delete", "text/plain")})
+    assert os.path.exists(os.path.join("uploads", "gone.txt"))
+
+    def broken(filename: str) -> None:
+        raise RuntimeError("index locked")
+
+    monkeypatch.setattr(main.search_index, "remove_filename", broken)
+    response = client.delete("/delete-file/gone.txt")
+    assert response.status_code == 200
+    assert response.json()["search_index_error"] == "index locked"
+    assert not os.path.exists(os.path.join("uploads", "gone.txt"))
+
+
+def test_search_stats(client):
+    stats = client.get("/search/stats").json()
+    assert stats["documents"] >= 0
+    assert "pending" in stats
@@ -0,0 +1,29 @@
+from benchmarks.line_items import make_invoice
+from benchmarks.loadtest import pdf_from_streams, pdf_string
+
+
+def text_pdf(*lines: str) -> bytes:
+    ops = ["BT /F1 10 Tf"]
+    for i, line in enumerate(lines):
+        ops.append(f"1 0 0 1 40 {800 - 14 * i} Tm ({pdf_string(line)}) Tj")
+    ops.append("ET")
+    return pdf_from_streams(["\n".join(ops).encode("latin-1")])
+
+
+def test_pdf_invoice_upload(client):
+    content, items = make_invoice(60)
+    response = client.post("/upload", files={"file": ("invoice.pdf", content, "application/pdf")})
+    assert response.status_code == 200
+    result = response.json()["result"]
+    assert result["word_count"] > 0
+    assert result["total_amount"] is not None
+    assert [item["amount"] for item in result["line_items"]] == [item[3] for item in items]
+
+
+def test_pdf_without_item_table(client):
+    content = text_pdf("The syntax of the tax code.", "Processing under the GDPR.")
+    response = client.post("/upload", files={"file": ("notes.pdf", content, "application/pdf")})
+    assert response.status_code == 200
+    result = response.json()["result"]
+    assert result["line_items"] is None
+    assert result["has_gdpr"] is True